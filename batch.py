@@ -0,0 +1,242 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Headless entry point for running a full day of deliveries
+This file runs the simulation from start to finish without any
+console output, user input or delays, then writes the delivery
+time and status of every parcel and the mileage of every truck.
+Usage:
+    python batch.py [--output FILE] [--nodes FILE] [--distances FILE]
+                    [--parcels FILE] [--snapshot FILE]
+                    [--profile FILE] [--cprofile FILE] [--trucks N]
+                    [--workers N] [--shortest-paths]
+                    [--planner greedy|savings]
+                    [--correct ID TIME ADDRESS ZIP ...]
+"""
+
+from __future__ import print_function
+
+import argparse
+import sys
+
+from clock import Clock, format_time, parse_time
+from events import EventEngine
+from profiler import Profiler, profile_call
+from table import Table
+import parcel
+from parcel import Status
+import graph
+from truck import build_fleet
+import loader
+import savings
+
+
+# the planners that can be used to load the trucks, by name
+PLANNERS = {'greedy': loader.Loader, 'savings': savings.SavingsLoader}
+
+
+class CorrectionError(ValueError):
+    # raised when an address correction can't be made, e.g. because the 
+    # address isn't in the graph
+    pass
+
+
+def parse_corrections(values):
+    # This function turns (ID, time, address, zip) strings, as given on 
+    # the command line, into the tuples used by run_day(). It raises a 
+    # ValueError for a bad ID or time, and runs in O(C), where C is the 
+    # number of corrections.
+    corrections = []
+    for id_, time, address, zip_ in values:
+        try:
+            corrections.append((int(id_), parse_time(time), address, zip_))
+        except ValueError:
+            raise ValueError('bad correction: ' + ' '.join((id_, time)))
+    return corrections
+
+
+def check_corrections(my_graph, corrections, parcel_ids):
+    # This function raises a CorrectionError for the first correction 
+    # whose parcel ID isn't in parcel_ids (the parcel table, or any other 
+    # collection of IDs) or whose address isn't in the graph, so that it 
+    # is found before the day starts rather than part way through. It 
+    # runs in O(C).
+    for parcel_id, time, address, zip_ in corrections:
+        if parcel_id not in parcel_ids:
+            raise CorrectionError('unknown parcel %d' % parcel_id)
+        if my_graph.get_node_by_address(address, zip_) is None:
+            raise CorrectionError('unknown address for parcel %d: %s %s' \
+                % (parcel_id, address, zip_))
+
+
+def report_corrections(failed, out=None):
+    # This function prints each (parcel ID, reason) pair from the event 
+    # engine's failed_corrections, so that a correction that couldn't be 
+    # made part way through the day isn't lost. The lines go to standard 
+    # error unless out is given. It runs in O(F), where F is the number 
+    # of failed corrections.
+    if out is None:
+        out = sys.stderr
+    for parcel_id, reason in failed:
+        out.write('correction for parcel %d not made: %s\n' \
+            % (parcel_id, reason))
+
+
+def start_day(my_graph, my_table, my_loader, trucks, current_time):
+    # This function gets everything ready for the day: it finds the
+    # delivery node of each parcel, parses the special instructions,
+    # loads the trucks and starts them. It runs in O(N) time, plus the
+    # time it takes the loader to build the first loads. It returns the
+    # parcels whose address isn't in the graph, which stay at the hub.
+    unresolved = my_graph.resolve_nodes(my_table.items())
+    for p in my_table.items():
+        if not p.delayed:
+            p.set_status(Status.AT_HUB)
+
+    my_loader.load()  #initializing loader
+    my_loader.run(trucks, current_time)  #sending trucks to loader
+
+    # starting each truck and giving them the current_time
+    for truck in trucks:
+        truck.start(current_time)
+    return unresolved
+
+
+def run_day(node_list, distance_list, parcel_list, snapshot=None, \
+            fleet_size=2, workers=None, shortest_paths=False, \
+            planner='greedy', corrections=None):
+    # This function loads the input files and simulates the whole day,
+    # jumping from one event to the next until every truck is finished
+    # and no more parcels are due at the hub. If a snapshot path is
+    # given, the graph is loaded from that snapshot when it is up to
+    # date, and the snapshot is rewritten when it isn't. fleet_size trucks
+    # are sent out from the hub, and their routes are planned with the
+    # given number of worker processes. If shortest_paths is True, trucks
+    # take the shortest path between stops, even if it goes through other
+    # nodes. planner names the entry in PLANNERS that loads the trucks.
+    # corrections is a list of (parcel ID, time, address, zip) tuples for 
+    # addresses that are corrected during the day. A CorrectionError is 
+    # raised if any of their parcels or addresses are unknown, and any 
+    # correction that still fails during the day is written to stderr.
+    # It returns the parcel table and the trucks so that the results can
+    # be written out.
+    my_graph = graph.Graph()
+    my_table = Table(indexes=('status', 'delivery_node', \
+                              'delivery_deadline', 'zip'))
+    if snapshot is None:
+        graph.load(node_list, distance_list, my_graph)
+        if shortest_paths:
+            my_graph.shortest_paths()
+    else:
+        graph.load_cached(node_list, distance_list, my_graph, snapshot, \
+                          shortest_paths)
+    parcel.report_errors(parcel_list, parcel.load(parcel_list, my_table))
+    check_corrections(my_graph, corrections or [], my_table)
+
+    trucks = build_fleet(fleet_size, my_graph.get_node(1))
+    my_loader = PLANNERS[planner](my_table, my_graph, workers)
+
+    clock = Clock()
+    clock.start()
+    try:
+        unresolved = start_day(my_graph, my_table, my_loader, trucks, \
+            clock.current_time)
+        parcel.report_unresolved(parcel_list, unresolved)
+
+        engine = EventEngine(clock, trucks, my_loader, my_table)
+        engine.start()
+        for parcel_id, time, address, zip_ in corrections or []:
+            engine.correct_address(time, parcel_id, address, zip_)
+        engine.run()
+        report_corrections(engine.failed_corrections)
+    finally:
+        my_loader.close()
+
+    return my_table, trucks
+
+
+def write_results(my_table, trucks, out):
+    # This function writes one line per parcel, in order of parcel ID,
+    # followed by one line per truck and the total mileage. It runs in
+    # O(N log N) because of the sort.
+    out.write('parcel,status,delivery_time,deadline\n')
+    for p in sorted(my_table.items(), key=lambda p: p.id):
+        out.write('%d,%s,%s,%s\n' % (p.id, p.get_status_string(), \
+            '' if p.delivery_time is None else format_time(p.delivery_time), \
+            'EOD' if p.delivery_deadline is None \
+            else format_time(p.delivery_deadline)))
+
+    out.write('\ntruck,miles\n')
+    total_miles = 0
+    for truck in trucks:
+        total_miles = total_miles + truck.get_total_miles()
+        out.write('%s,%.2f\n' % (truck.id, truck.get_total_miles()))
+    out.write('total,%.2f\n' % total_miles)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Simulate a full day of '
+        'deliveries without user input and write the results.')
+    parser.add_argument('--output', help='file to write the results to '
+        '(defaults to standard output)')
+    parser.add_argument('--nodes', default='node_list.csv')
+    parser.add_argument('--distances', default='distance_list.csv')
+    parser.add_argument('--parcels', default='parcel_list.csv')
+    parser.add_argument('--snapshot', help='binary graph snapshot to load '
+        'the graph from, created or refreshed from the CSV files as needed')
+    parser.add_argument('--profile', help='file to write a report of the '
+        'time spent in each phase to')
+    parser.add_argument('--cprofile', help='file to write cProfile stats to')
+    parser.add_argument('--trucks', type=int, default=2, help='number of '
+        'trucks in the fleet')
+    parser.add_argument('--workers', type=int, help='number of processes '
+        'used to plan the routes of trucks that are loaded together')
+    parser.add_argument('--shortest-paths', action='store_true', \
+        help='let trucks drive through other nodes when that is shorter '
+        'than the direct distance')
+    parser.add_argument('--planner', choices=sorted(PLANNERS), \
+        default='greedy', help='how the trucks are loaded')
+    parser.add_argument('--correct', nargs=4, action='append', \
+        metavar=('ID', 'TIME', 'ADDRESS', 'ZIP'), help='correct the '
+        'address of a parcel at the given time, e.g. 9 "10:20 AM" '
+        '"410 S State St" 84111. May be given more than once.')
+    args = parser.parse_args(argv)
+    if args.trucks < 1:
+        parser.error('--trucks must be at least 1')
+
+    try:
+        corrections = parse_corrections(args.correct or [])
+    except ValueError as error:
+        parser.error(str(error))
+
+    profiler = None
+    if args.profile is not None:
+        profiler = Profiler()
+        profiler.install()
+
+    try:
+        day_args = (args.nodes, args.distances, args.parcels, args.snapshot, \
+                    args.trucks, args.workers, args.shortest_paths, \
+                    args.planner, corrections)
+        if args.cprofile is not None:
+            my_table, trucks = profile_call(args.cprofile, run_day, *day_args)
+        else:
+            my_table, trucks = run_day(*day_args)
+    except (CorrectionError, graph.GraphSizeError) as error:
+        parser.error(str(error))
+    finally:
+        if profiler is not None:
+            profiler.uninstall()
+
+    if profiler is not None:
+        with open(args.profile, 'w', encoding='utf-8') as out:
+            profiler.report(out)
+
+    if args.output is None:
+        write_results(my_table, trucks, sys.stdout)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as out:
+            write_results(my_table, trucks, out)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Benchmarks for the delivery simulation
+Generates a synthetic city and manifest for each parcel count and
+times each phase of the simulation on it. Run with a list of parcel
+counts, e.g.
+    python benchmark.py 100 1000 10000 [--json results.json]
+                        [--compare old.json]
+The results can be saved as JSON and compared against an earlier run
+to catch regressions.
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import platform
+import shutil
+import tempfile
+import time
+
+from batch import PLANNERS
+from clock import Clock, DAY_START
+from events import EventEngine
+from table import Table
+from truck import build_fleet
+import generator
+import graph
+import parcel
+from parcel import Status
+
+
+PHASES = ['graph_load', 'parcel_load', 'prepare', 'lookup', 'loader_run', \
+          'simulate']
+
+
+class Timer:
+    # Small helper for timing the phases of a run. Each phase is timed
+    # with a with statement and its time in seconds is kept in phases.
+
+    def __init__(self):
+        self.phases = {}
+        self.name = None
+        self.started = None
+
+    def phase(self, name):
+        self.name = name
+        return self
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.phases[self.name] = time.perf_counter() - self.started
+        return False
+
+
+def node_count_for(parcel_count):
+    # The city grows with the manifest, about one address for every ten
+    # parcels, but is capped so the distance file stays a sensible size
+    return min(max(27, parcel_count // 10), 1000)
+
+
+def bench_day(directory, parcel_count, node_count, truck_count, seed=0, \
+              link_rate=0.02, workers=None, planner='greedy'):
+    # This function writes a city and manifest into the directory, then
+    # runs a full day on it and returns the time taken by each phase.
+    node_path, distance_path, parcel_path = generator.generate(directory, \
+        node_count, parcel_count, seed, link_rate=link_rate)
+
+    timer = Timer()
+    my_graph = graph.Graph()
+    my_table = Table(indexes=('status', 'delivery_node', \
+                              'delivery_deadline', 'zip'))
+
+    with timer.phase('graph_load'):
+        graph.load(node_path, distance_path, my_graph)
+
+    with timer.phase('parcel_load'):
+        errors = parcel.load(parcel_path, my_table)
+    parcel.report_errors(parcel_path, errors)
+
+    trucks = build_fleet(truck_count, my_graph.get_node(1))
+    my_loader = PLANNERS[planner](my_table, my_graph, workers)
+
+    with timer.phase('prepare'):
+        unresolved = my_graph.resolve_nodes(my_table.items())
+        for p in my_table.items():
+            if not p.delayed:
+                p.set_status(Status.AT_HUB)
+        my_loader.load()
+    parcel.report_unresolved(parcel_path, unresolved)
+
+    with timer.phase('lookup'):
+        my_table.lookup(status=Status.AT_HUB)
+        my_table.lookup(status=Status.AT_HUB, deadline='not None')
+        my_table.lookup(status=Status.AT_HUB, deadline='None')
+        my_table.lookup(status=Status.INFORMATION_RECEIVED)
+        for node_id in range(1, min(node_count, 100) + 1):
+            my_table.lookup(delivery_node=my_graph.get_node(node_id))
+
+    clock = Clock()
+    clock.start()
+    try:
+        with timer.phase('loader_run'):
+            my_loader.run(trucks, clock.current_time)
+            for truck in trucks:
+                truck.start(clock.current_time)
+
+        with timer.phase('simulate'):
+            engine = EventEngine(clock, trucks, my_loader, my_table)
+            engine.start()
+            engine.run()
+    finally:
+        my_loader.close()
+
+    delivered = len(my_table.lookup(status=(Status.DELIVERED, \
+                                            Status.DELIVERED_LATE)))
+    return {
+        'parcels': parcel_count,
+        'nodes': node_count,
+        'trucks': truck_count,
+        'delivered': delivered,
+        'end_time': clock.current_time - DAY_START,
+        'phases': timer.phases,
+    }
+
+
+def run_suite(parcel_counts, truck_count=2, seed=0, link_rate=0.02, \
+              node_count=None, workers=None, planner='greedy'):
+    # This function benchmarks each parcel count in its own temporary
+    # directory and returns the list of results
+    results = []
+    for parcel_count in parcel_counts:
+        nodes = node_count
+        if nodes is None:
+            nodes = node_count_for(parcel_count)
+        directory = tempfile.mkdtemp()
+        try:
+            results.append(bench_day(directory, parcel_count, nodes, \
+                                     truck_count, seed, link_rate, workers, \
+                                     planner))
+        finally:
+            shutil.rmtree(directory)
+        print_result(results[-1])
+    return results
+
+
+def print_header():
+    print('%8s %6s' % ('parcels', 'nodes') \
+        + ''.join(' %11s' % name for name in PHASES))
+
+
+def print_result(result):
+    print('%8d %6d' % (result['parcels'], result['nodes']) \
+        + ''.join(' %11.3f' % result['phases'][name] for name in PHASES))
+
+
+def compare(results, previous):
+    # This function prints how long each phase took compared to an
+    # earlier run with the same parcel count. Ratios above 1 are slower.
+    earlier = {}
+    for result in previous['results']:
+        earlier[result['parcels']] = result
+
+    print('\nratio to previous run')
+    print_header()
+    for result in results:
+        old = earlier.get(result['parcels'])
+        if old is None:
+            continue
+        ratios = []
+        for name in PHASES:
+            before = old['phases'].get(name)
+            if before:
+                ratios.append(' %11.2f' % (result['phases'][name] / before))
+            else:
+                ratios.append(' %11s' % '-')
+        print('%8d %6d' % (result['parcels'], result['nodes']) \
+            + ''.join(ratios))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Time each phase of the '
+        'simulation on synthetic manifests of growing size.')
+    parser.add_argument('parcels', type=int, nargs='*', \
+        default=[100, 1000, 10000])
+    parser.add_argument('--nodes', type=int, help='number of addresses in '
+        'the city (defaults to one for every ten parcels)')
+    parser.add_argument('--trucks', type=int, default=2)
+    parser.add_argument('--workers', type=int, help='number of processes '
+        'used to plan routes')
+    parser.add_argument('--planner', choices=sorted(PLANNERS), \
+        default='greedy')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--links', type=float, default=0.02, help='share of '
+        'parcels that must be delivered with others')
+    parser.add_argument('--json', help='file to save the results to')
+    parser.add_argument('--compare', help='results file from an earlier run')
+    args = parser.parse_args(argv)
+    if args.trucks < 1:
+        parser.error('--trucks must be at least 1')
+
+    print_header()
+    results = run_suite(args.parcels, args.trucks, args.seed, args.links, \
+                        args.nodes, args.workers, args.planner)
+
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'python': platform.python_version(), \
+                       'seed': args.seed, 'results': results}, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(results, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Module for the Clock class used by the simulation
+All times in the simulation are whole minutes since midnight, so 
+8:00 AM is 480. parse_time() and format_time() convert to and from 
+the times that people read and write.
+"""
+
+# the time of day that the trucks leave the hub, in minutes
+DAY_START = 8 * 60
+
+
+def parse_time(text):
+    # This function converts a time like '10:30 AM', '9:05 am' or 
+    # '14:00' into minutes since midnight. It raises a ValueError for 
+    # anything that isn't a valid time, and runs in O(1).
+    words = text.strip().upper().split()
+    hours, minutes = words[0].split(':')
+    hours = int(hours)
+    minutes = int(minutes)
+    if len(words) > 2 or minutes < 0 or minutes >= 60 or hours < 0 \
+            or hours > 23:
+        raise ValueError('invalid time: ' + text)
+
+    if len(words) == 2:
+        if words[1] not in ('AM', 'PM') or hours < 1 or hours > 12:
+            raise ValueError('invalid time: ' + text)
+        hours = hours % 12
+        if words[1] == 'PM':
+            hours = hours + 12  # for 24-hour time
+
+    return hours * 60 + minutes
+
+
+def format_time(minutes):
+    # This function converts minutes since midnight into a time like 
+    # '10:30 AM' for display. It runs in O(1).
+    hours, minutes = divmod(minutes, 60)
+    if hours % 24 < 12:
+        suffix = 'AM'
+    else:
+        suffix = 'PM'
+    hours = hours % 12
+    if hours == 0:
+        hours = 12
+    return '%d:%02d %s' % (hours, minutes, suffix)
+
+
+# The point of the following two classes is to be able to throw 
+# a custom Error when the Clock class tries to enter an invalid state
+class Error(Exception):
+    """Base Error class that inherits from Exception"""
+    # pass executes in O(1) time
+    pass
+
+
+class StateError(Error):
+    """Error thrown when clock is sent to an invalid state"""
+    # this init method executes in O(1) time
+    def __init__(self, message):
+        self.message = message
+
+
+class Clock:
+    """Clock class that handles the time keeping for the 
+    Simulator class.
+    """
+
+    # The Clock class has six methods, excluding its init() method. 
+    # Each of these methods are designed to simulate the passage of time 
+    # during our simulation. With each call of the tick() method, the 
+    # clock will update and pass the new time value on to the 
+    # Simulation class, which will inform all other components of our 
+    # simulation of the new current_time value so that each component 
+    # can update its own state and keep the simulation synced.
+
+    # __init__ here executes in O(1) time
+    def __init__(self, start_time=DAY_START, interval=1):
+        self.start_time = start_time
+        self.interval = interval
+
+        self.current_time = None
+        self.running = False
+        self.paused = False
+    
+    # because there are no loops, only a series of statements, this method
+    # will run in O(1) time because only a finite number of statements will 
+    # be executed
+    def start(self):
+        if not self.running:
+            self.running = True
+            if not self.paused:
+                self.current_time = self.start_time
+            else:
+                self.paused = False
+        else:
+            raise StateError('Clock is already running!')
+    
+    # stop runs in O(1) for the same reason as above
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.paused = False
+        else:
+            raise StateError('Clock is not running!')
+    
+    # tick has a finite number of statements and no loops, so it will 
+    # run in O(1) time
+    def tick(self):
+        if self.running and not self.paused:
+            self.current_time = self.next_time(self.current_time)
+        else:
+            raise StateError('Clock is not running or paused!')
+    
+    # next_time returns the time that tick() would move the clock to 
+    # from the given time, without changing the clock. It runs in O(1).
+    def next_time(self, timestamp):
+        return timestamp + self.interval
+
+    # advance_to jumps the clock straight to the given time, which is 
+    # used by the event engine to skip over minutes where nothing 
+    # happens. It runs in O(1).
+    def advance_to(self, timestamp):
+        if not self.running or self.paused:
+            raise StateError('Clock is not running or paused!')
+        if timestamp < self.current_time:
+            raise StateError('Clock cannot go back in time!')
+        self.current_time = timestamp
+
+    # pause runs in O(1) time
+    def pause(self):
+        if self.running:
+            self.paused = True
+        else:
+            raise StateError('Clock is not running!')
@@ -0,0 +1,76 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+
+"""Module for creating Disjoint Set (union-find) data structure"""
+
+class DisjointSet:
+    """Disjoint Set"""
+
+    # This class keeps track of items that have been joined together
+    # into sets, such as parcels that must be delivered together. Each
+    # set is stored as a tree, with each item pointing at its parent and
+    # the root of the tree standing for the whole set. Trees are kept
+    # shallow by hanging the smaller tree under the larger one when two
+    # sets are joined, and by pointing items straight at their root once
+    # it has been found, so find() and union() run in nearly O(1) time
+    # (the inverse Ackermann function of N).
+
+    def __init__(self):
+        # init has a runtime of O(1)
+        self.parents = {}
+        self.sizes = {}
+
+    def add(self, item):
+        # this method adds the item as a set of its own if it isn't
+        # already in the structure, and has a runtime of O(1)
+        if item not in self.parents:
+            self.parents[item] = item
+            self.sizes[item] = 1
+
+    def find(self, item):
+        # This method returns the root of the item's set. Every item on
+        # the way to the root is pointed directly at it afterwards.
+        self.add(item)
+        root = item
+        while self.parents[root] != root:
+            root = self.parents[root]
+        while self.parents[item] != root:
+            self.parents[item], item = root, self.parents[item]
+        return root
+
+    def union(self, item_a, item_b):
+        # This method joins the sets holding the two items, and returns
+        # the root of the joined set
+        root_a = self.find(item_a)
+        root_b = self.find(item_b)
+        if root_a == root_b:
+            return root_a
+        if self.sizes[root_a] < self.sizes[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parents[root_b] = root_a
+        self.sizes[root_a] = self.sizes[root_a] + self.sizes[root_b]
+        return root_a
+
+    def size(self, item):
+        # this method returns the size of the item's set
+        return self.sizes[self.find(item)]
+
+    def __contains__(self, item):
+        # this method has a runtime of O(1)
+        return item in self.parents
+
+    def __len__(self):
+        # this method has a runtime of O(1)
+        return len(self.parents)
+
+    def sets(self):
+        # This method returns a dictionary from the root of each set to
+        # the list of its items, in the order they were added. It has a
+        # runtime of O(N).
+        values = {}
+        for item in self.parents:
+            root = self.find(item)
+            if root not in values:
+                values[root] = []
+            values[root].append(item)
+        return values
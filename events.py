@@ -0,0 +1,262 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Module for the discrete-event simulation engine
+Instead of updating every truck on every minute of the day, the
+engine keeps a heap of the times at which something will happen
+and jumps straight from one to the next.
+"""
+
+import heapq
+
+from parcel import Status
+
+
+class EventEngine:
+    """Event-driven engine that moves the trucks and parcels through
+    the day. Produces the same results as ticking the clock one minute
+    at a time and updating everything on every tick.
+    """
+
+    # Events are stored in a heap as (time, kind, index) tuples. Events
+    # at the same time are handled in the same order as the minute-tick
+    # loop: trucks first, in fleet order, then parcels arriving at the
+    # hub, then any scheduled actions. Trucks that get back to the hub at
+    # the same time are reloaded together. Pushing and popping events runs
+    # in O(log E), where E is the number of pending events.
+    TRUCK = 0
+    PARCELS = 1
+    ACTION = 2
+
+    # init runs in O(1)
+    def __init__(self, clock, trucks, loader, parcel_table):
+        self.clock = clock
+        self.trucks = trucks
+        self.loader = loader
+        self.parcel_table = parcel_table
+
+        self.events = []
+
+        # the time each truck is next scheduled to be updated. Truck
+        # events that don't match this time are out of date and skipped.
+        self.wake_times = {}
+
+        # trucks that are finished and parked at the hub. They only
+        # need to be updated again once more parcels arrive at the hub.
+        self.waiting = set()
+
+        # times that already have a parcel arrival event, and the
+        # actions scheduled for each time
+        self.arrival_times = set()
+        self.actions = {}
+
+        # (parcel ID, reason) for each address correction that couldn't 
+        # be made, e.g. because the address isn't in the graph
+        self.failed_corrections = []
+
+    def schedule(self, time, kind, index=0):
+        # this method runs in O(log E)
+        heapq.heappush(self.events, (time, kind, index))
+
+    def schedule_action(self, time, action):
+        # This method schedules a function to be called with the current
+        # time once the clock reaches the given time, e.g. to correct a
+        # parcel's address. It runs in O(log E).
+        if time not in self.actions:
+            self.actions[time] = []
+            self.schedule(time, self.ACTION)
+        self.actions[time].append(action)
+
+    def first_tick(self, time, now):
+        # This method returns the first minute after now at which
+        # something due at the given time would be noticed by the
+        # minute-tick loop. It runs in O(1).
+        if time > now:
+            return time
+        return self.clock.next_time(now)
+
+    def is_parked(self, truck):
+        # A truck that has finished for the day and is sitting at the hub
+        # with no cargo does nothing when it is updated unless there are
+        # new parcels to load. This method runs in O(1).
+        return truck.is_finished() and truck.load_count() == 0 \
+            and truck.curr_node is truck.hub_node \
+            and truck.next_node is truck.hub_node
+
+    def schedule_truck(self, index, now):
+        # This method works out when a truck next needs to be updated,
+        # and runs in O(log E)
+        truck = self.trucks[index]
+        if self.is_parked(truck):
+            self.wake_times.pop(index, None)
+            self.waiting.add(index)
+        else:
+            time = self.first_tick(truck.get_arrival_time(), now)
+            self.wake_times[index] = time
+            self.waiting.discard(index)
+            self.schedule(time, self.TRUCK, index)
+
+    def schedule_parcels(self, now):
+        # This method adds an event for each time at which delayed
+        # parcels will arrive at the hub. It runs in O(N log E), where
+        # N is the number of parcels that haven't arrived yet.
+        for p in self.parcel_table.lookup(status=Status.INFORMATION_RECEIVED):
+            if p.arrival_time is not None:
+                time = self.first_tick(p.arrival_time, now)
+                if time not in self.arrival_times:
+                    self.arrival_times.add(time)
+                    self.schedule(time, self.PARCELS)
+
+    def start(self):
+        # This method schedules the first events, once the trucks have
+        # been loaded and started. It runs in O(N log E).
+        now = self.clock.current_time
+        for index in range(len(self.trucks)):
+            self.schedule_truck(index, now)
+        self.schedule_parcels(now)
+
+    def next_event_time(self):
+        # This method returns the time of the next event, or None if
+        # there is nothing left to happen. Out-of-date truck events are
+        # dropped along the way, so it runs in O(log E) amortized.
+        while len(self.events) > 0:
+            time, kind, index = self.events[0]
+            if kind == self.TRUCK and self.wake_times.get(index) != time:
+                heapq.heappop(self.events)
+            else:
+                return time
+        return None
+
+    def process(self, time):
+        # This method handles every event at the given time, in the same
+        # order as the minute-tick loop. It runs in O(T + P), where T is
+        # the number of trucks updated and P is the number of parcels
+        # arriving at the hub, plus the loader's work for any trucks
+        # that need a new load.
+        due = []
+        parcels_arrive = False
+        actions = []
+        while self.next_event_time() == time:
+            time, kind, index = heapq.heappop(self.events)
+            if kind == self.TRUCK:
+                due.append(index)
+                del self.wake_times[index]
+            elif kind == self.PARCELS:
+                parcels_arrive = True
+                self.arrival_times.discard(time)
+            else:
+                actions.extend(self.actions.pop(time, []))
+        due.sort()
+
+        # updating trucks
+        responses = {}
+        for index in due:
+            responses[index] = self.trucks[index].update(time)
+
+        # Trucks that are back at the hub are loaded together with a 
+        # single call to the loader, so that the deadline parcels are 
+        # shared out between them. If there is nothing left to load, 
+        # they are finished for the day.
+        reloading = [self.trucks[index] for index in due \
+                     if responses[index] == 1]
+        if len(reloading) > 0:
+            response = self.loader.run(reloading, time)
+            for truck in reloading:
+                truck.start(time)
+            if response == 1:
+                for truck in reloading:
+                    truck.finish_day()
+
+        for index in due:
+            self.schedule_truck(index, time)
+
+        # Parcels that reach the hub just as trucks are leaving are added 
+        # to their routes, rather than waiting for the next load.
+        if parcels_arrive:
+            arrived = self.receive_parcels(time)
+            leaving = [truck for truck in reloading if truck.is_leaving(time)]
+            if len(arrived) > 0 and len(leaving) > 0:
+                self.reschedule(self.loader.insert_parcels(leaving, \
+                    arrived, time), time)
+
+        for action in actions:
+            action(time)
+
+        # Parked trucks will look for new parcels on the next tick. Waking 
+        # a parked truck when there is nothing new to load has no effect, 
+        # so they are woken after any action as well.
+        if parcels_arrive or len(actions) > 0:
+            for index in sorted(self.waiting):
+                self.schedule_truck_at(index, self.clock.next_time(time))
+            self.waiting.clear()
+
+    def receive_parcels(self, time):
+        # This method marks every parcel that has reached the hub by the 
+        # given time as being at the hub, and returns them. It runs in 
+        # O(P), where P is the number of parcels that haven't arrived yet.
+        arrived = []
+        for p in self.parcel_table.lookup(status=Status.INFORMATION_RECEIVED):
+            if time >= p.arrival_time:
+                p.set_status(Status.AT_HUB)
+                arrived.append(p)
+        return arrived
+
+    def correct_address(self, time, parcel_id, address, zip_):
+        # This method schedules a parcel's address to be corrected at the 
+        # given time. If the parcel is on a truck by then, only that 
+        # truck's route is changed, through Loader.readdress(). A 
+        # correction that can't be made is added to failed_corrections, 
+        # and the rest of the day goes on as before. It runs in O(log E).
+        def correct(now):
+            parcel = self.parcel_table.get(parcel_id)
+            if parcel is None:
+                self.failed_corrections.append((parcel_id, 'no such parcel'))
+                return
+            try:
+                trucks = self.loader.readdress(parcel, address, zip_, \
+                    self.trucks, now)
+            except ValueError as error:
+                self.failed_corrections.append((parcel_id, str(error)))
+                return
+            self.reschedule(trucks, now)
+        self.schedule_action(time, correct)
+
+    def reschedule(self, trucks, now):
+        # This method schedules the given trucks again after their routes 
+        # have changed, in O(T log E), where T is the size of the fleet
+        for index, truck in enumerate(self.trucks):
+            if truck in trucks:
+                self.schedule_truck(index, now)
+
+    def schedule_truck_at(self, index, time):
+        # this method schedules a truck to be updated at the given time,
+        # and runs in O(log E)
+        self.wake_times[index] = time
+        self.schedule(time, self.TRUCK, index)
+
+    def advance_to(self, timestamp):
+        # This method handles every event up to and including the given
+        # time, moving the clock forward as it goes.
+        next_time = self.next_event_time()
+        while next_time is not None and next_time <= timestamp:
+            if self.clock.current_time < next_time:
+                self.clock.advance_to(next_time)
+            self.process(next_time)
+            next_time = self.next_event_time()
+        if self.clock.current_time < timestamp:
+            self.clock.advance_to(timestamp)
+
+    def run(self, end_time=None):
+        # This method fast-forwards through the day, jumping from one
+        # event to the next until there is nothing left to happen or the
+        # end time is reached. It runs in O(E log E), plus the work done
+        # for each event.
+        next_time = self.next_event_time()
+        while next_time is not None:
+            if end_time is not None and next_time > end_time:
+                break
+            self.advance_to(next_time)
+            next_time = self.next_event_time()
+
+    def is_finished(self):
+        # this method runs in O(1)
+        return self.next_event_time() is None
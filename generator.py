@@ -0,0 +1,134 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Generator for synthetic cities and parcel manifests
+Writes node_list.csv, distance_list.csv and parcel_list.csv files of
+any size, in the same format as the files that ship with the project.
+The same seed always produces the same files. Usage:
+    python generator.py DIRECTORY --nodes 100 --parcels 1000 [--seed 0]
+"""
+
+from __future__ import print_function
+
+import argparse
+import math
+import os
+import random
+
+from clock import format_time
+
+
+STREETS = ['Main St', 'State St', 'Canyon Rd', 'Oakland Ave', 'Dalton Ave',
+           'Lester St', 'Parkway Blvd', 'Barton Blvd', 'Taylorsville Blvd',
+           'Valley Central Station', 'Redwood Rd', 'Bluff Dr']
+
+
+def write_city(directory, node_count, seed=0):
+    # This function writes a node file and a lower-triangular distance
+    # file for a random city with node_count nodes. The nodes are placed
+    # at random on a map about 15 miles across, and each distance is the
+    # straight-line distance between two nodes, stretched a little to
+    # stand in for the road network. It runs in O(M^2), where M is the
+    # number of nodes.
+    rng = random.Random(seed)
+    node_path = os.path.join(directory, 'node_list.csv')
+    distance_path = os.path.join(directory, 'distance_list.csv')
+
+    points = [(rng.uniform(0, 15), rng.uniform(0, 15)) \
+              for i in range(node_count)]
+
+    with open(node_path, 'w', encoding='utf-8') as f:
+        f.write('HUB,84107\n')
+        for i in range(1, node_count):
+            f.write('%d %s,%d\n' % (i * 10, STREETS[i % len(STREETS)], \
+                84100 + rng.randint(1, 99)))
+
+    with open(distance_path, 'w', encoding='utf-8') as f:
+        for i in range(node_count):
+            x1, y1 = points[i]
+            row = []
+            for j in range(i):
+                x2, y2 = points[j]
+                straight = math.sqrt((x1 - x2) ** 2 + (y1 - y2) ** 2)
+                row.append('%.1f' % max(0.5, straight \
+                    * rng.uniform(1.1, 1.4)))
+            row.append('0')
+            row.extend([''] * (node_count - i - 1))
+            f.write(','.join(row) + '\n')
+
+    return node_path, distance_path
+
+
+def write_manifest(directory, node_path, parcel_count, seed=0, \
+                   deadline_rate=0.25, delay_rate=0.1, truck_rate=0.1, \
+                   wrong_address_rate=0.01, link_rate=0.02):
+    # This function writes a parcel file with parcel_count parcels going
+    # to the addresses in the node file. Each rate is the share of
+    # parcels that get a deadline, a delay, a truck restriction, a wrong
+    # address note or a "delivered with" link. Links are made between
+    # small clusters of nearby parcel IDs. It runs in O(N), where N is
+    # the number of parcels.
+    rng = random.Random(seed)
+    parcel_path = os.path.join(directory, 'parcel_list.csv')
+
+    with open(node_path, 'r', encoding='utf-8') as f:
+        addresses = [line.strip().split(',') for line in f][1:]
+
+    deadlines = ['9:00 AM', '10:30 AM', '10:30 AM', '12:00 PM']
+
+    with open(parcel_path, 'w', encoding='utf-8') as f:
+        for i in range(1, parcel_count + 1):
+            address, zip_ = rng.choice(addresses)
+
+            deadline = 'EOD'
+            if rng.random() < deadline_rate:
+                deadline = rng.choice(deadlines)
+
+            instr = ''
+            roll = rng.random()
+            if roll < delay_rate:
+                arrival = format_time(rng.randint(8 * 60 + 30, 10 * 60 + 30))
+                instr = 'Delayed on flight---will not arrive to depot ' \
+                    + 'until ' + arrival.lower()
+            elif roll < delay_rate + truck_rate:
+                instr = 'Can only be on truck 2'
+            elif roll < delay_rate + truck_rate + wrong_address_rate:
+                instr = 'Wrong address listed'
+            elif roll < delay_rate + truck_rate + wrong_address_rate \
+                    + link_rate and parcel_count > 3:
+                companions = rng.sample([j for j in range(i - 3, i + 4) \
+                    if j != i and 1 <= j <= parcel_count], 2)
+                instr = '"Must be delivered with %d, %d"' % tuple(companions)
+
+            f.write('%d,%s,Salt Lake City,UT,%s,%s,%d,%s\n' % (i, address, \
+                zip_, deadline, rng.randint(1, 88), instr))
+
+    return parcel_path
+
+
+def generate(directory, node_count, parcel_count, seed=0, **rates):
+    # This function writes all three input files into the directory and
+    # returns their paths
+    node_path, distance_path = write_city(directory, node_count, seed)
+    parcel_path = write_manifest(directory, node_path, parcel_count, \
+                                 seed, **rates)
+    return node_path, distance_path, parcel_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write a synthetic city '
+        'and parcel manifest.')
+    parser.add_argument('directory')
+    parser.add_argument('--nodes', type=int, default=27)
+    parser.add_argument('--parcels', type=int, default=40)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        os.makedirs(args.directory)
+    for path in generate(args.directory, args.nodes, args.parcels, \
+                         args.seed):
+        print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,24 @@
 # C950 - Anthony Utt - autt3 - ID#000854797
 
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+import math
+from multiprocessing import shared_memory
+
 from table import Table
+from parcel import Status
 from parcel_group import ParcelGroup
-import math
+from route import RouteOptimizer
+from clock import DAY_START
+from graph import Graph
+from disjoint_set import DisjointSet
+
+
+def as_hhmm(minutes):
+    # turns minutes since midnight into an HHMM number, e.g. 570 (9:30 AM) 
+    # into 930. It runs in O(1).
+    return (minutes // 60) * 100 + minutes % 60
+
 
 class Loader:
     # The Loader class manages the sorting of parcels between the 
@@ -10,76 +26,317 @@ class Loader:
     # active trucks so that no one truck gets an unfair load
 
     # init completes in O(1)
-    def __init__(self, parcel_table, graph):
+    def __init__(self, parcel_table, graph, workers=None):
         self.parcel_table = parcel_table
         self.graph = graph
 
-    # the function call in this function completes in O(1)
+        # map from each delivery node to the parcels going there, built 
+        # once by load() so that groups don't need a table lookup
+        self.destinations = {}
+
+        # map from the ID of each linked parcel to the list of parcels 
+        # that must be delivered along with it (its cluster), also built 
+        # by load()
+        self.clusters = {}
+
+        # the optimizer that improves each route after it has been 
+        # built, and the total miles it has saved so far. Setting 
+        # optimizer to None keeps the greedy routes as they are. It only 
+        # uses its move budget, without a time limit, so the routes are 
+        # the same however busy the machine is and however many workers 
+        # plan them.
+        self.optimizer = RouteOptimizer(graph, time_limit=None)
+        self.miles_saved = 0
+
+        # used to work out arrival times and deadlines, even when routes 
+        # aren't being improved afterwards
+        self.timetable = RouteOptimizer(graph, time_limit=None)
+
+        # number of processes used to plan the routes of several trucks 
+        # at once. The pool is started the first time it is needed, and 
+        # the distances are copied once into a block of shared memory 
+        # that every process reads from, so close() should be called if 
+        # the graph changes afterwards.
+        self.workers = workers
+        self.pool = None
+        self.shared_distances = None
+
+    # the function calls in these functions complete in O(K), where K is 
+    # the number of parcels at the hub
     def get_remaining_parcels(self):
-        return self.parcel_table.lookup(status='AT HUB', deadline='None')
+        return [parcel for parcel in self.parcel_table.lookup( \
+            status=Status.AT_HUB, deadline='None') if self.is_ready(parcel)]
+
+    def get_deadline_parcels(self):
+        return [parcel for parcel in self.parcel_table.lookup( \
+            status=Status.AT_HUB, deadline='not None') \
+            if self.is_ready(parcel)]
+
+    def is_ready(self, parcel):
+        # This method checks whether a parcel can leave the hub. Parcels 
+        # with a wrong address are kept at the hub until their address 
+        # has been corrected through readdress(), and so are parcels 
+        # whose address isn't in the graph. It runs in O(1).
+        return parcel.status == Status.AT_HUB and not parcel.wrong_address \
+            and parcel.delivery_node is not None
 
     # set_parcel_priority() runs in O(1) time
     def set_parcel_priority(self, parcel):
         priority = 0
-        # bit of math to determine how to prioritize the parcels
+        # bit of math to determine how to prioritize the parcels. The 
+        # buckets were tuned when times were written as HHMM numbers 
+        # (9:00 AM as 900), and reorder_parcels() weights them heavily, 
+        # so the deadline and the start of the day are put back into 
+        # that form to keep the same buckets: 9:00 AM gets 3, 10:30 AM 
+        # gets 1 and end of day gets 0.
         if parcel.delivery_deadline is not None:
-            priority = 5 - math.ceil((parcel.delivery_deadline - 800) / 60)
+            deadline = as_hhmm(parcel.delivery_deadline)
+            priority = 5 - math.ceil((deadline - as_hhmm(DAY_START)) / 60)
         parcel.set_priority(priority)
     
-    def create_parcel_group(self, parcel):
-        # This method has a worst-case runtime of O(N). It queries the table 
-        # to find all parcels going to a given destination and then creates 
-        # a ParcelGroup to hold those parcels
+    def create_parcel_group(self, parcel, limit=None):
+        # This method creates a ParcelGroup holding every parcel that is 
+        # at the hub and going to the same destination as the given 
+        # parcel. The parcels for each destination are found through the 
+        # map built by load(), and their statuses are checked as the group 
+        # is built, so parcels that have already left the hub or haven't 
+        # arrived yet are skipped, as are linked parcels from any cluster 
+        # other than the given parcel's, so that a cluster is never loaded 
+        # in pieces. If there are more than limit parcels, only the limit 
+        # with the highest priority are grouped, linked parcels first, so 
+        # that a group always fits on a truck and the rest wait for a 
+        # later load. It runs in O(K), where K is the number of parcels 
+        # going to that destination, or O(K log K) if the group has to be 
+        # cut down.
         destination = parcel.delivery_node
-        group_items = self.parcel_table.lookup(delivery_node=destination)
+        cluster = self.clusters.get(parcel.id)
+        items = [item for item in self.destinations.get(destination, []) \
+                 if self.is_ready(item) \
+                 and self.clusters.get(item.id, cluster) is cluster]
+        if limit is not None and len(items) > limit:
+            items.sort(key=lambda item: (item.linked, item.priority), \
+                reverse=True)
+            items = items[:limit]
+
         new_group = ParcelGroup()
-        for item in group_items:
+        for item in items:
             new_group.add_parcel(item)
 
         return new_group
-        
-    def get_all_linked_parcels(self):
-        # This method has a worst-case runtime of O(N) as it looks through 
-        # each parcel in the system to check whether it is a linked parcel
-        values = []
-        for parcel in self.parcel_table.items():
-            if parcel.linked:
-                values.append(parcel)
-
-        return values
-
-    def confirm_links(self, parcel):
-        # This method runs in O(N) as it looks through each parcel to 
-        # make sure all linked parcels are marked as such
-        if parcel.companion_parcels:
-            parcel.linked = True
-        else:
-            for p in self.parcel_table.items():
-                if len(p.companions) > 0:
-                    if parcel.id in p.companions:
-                        parcel.linked = True
-
-    def reorder_parcels(self, load):
-        d_node_list = [i.get_destination() for i in load]
-        route = []
-        curr_node = self.graph.get_node(1)
-        while len(d_node_list) > 0:
-            next_node = None
-            for node in d_node_list:
-                if curr_node.get_distance(node) < curr_node.get_distance(next_node):
-                    next_node = node
-            route.append(next_node)
-            d_node_list.remove(next_node)
-            curr_node = next_node
 
+    def add_destination(self, parcel):
+        # This method adds a parcel to the destination map in O(1)
+        destination = parcel.delivery_node
+        if destination not in self.destinations:
+            self.destinations[destination] = []
+        self.destinations[destination].append(parcel)
+
+    def remove_destination(self, parcel):
+        # This method takes a parcel out of the destination map, e.g. 
+        # before its address is corrected. It runs in O(K), where K is 
+        # the number of parcels going to the same destination.
+        parcels = self.destinations.get(parcel.delivery_node)
+        if parcels is not None and parcel in parcels:
+            parcels.remove(parcel)
+
+    def find_clusters(self, parcels):
+        # This method joins each parcel with the parcels it must be 
+        # delivered with, using a disjoint set, so that parcels that are 
+        # linked through other parcels end up in the same cluster. Every 
+        # parcel in a cluster is marked as linked, and the parcels in each 
+        # cluster are kept in the order they were given. Companions that 
+        # aren't in the table are ignored. It runs in O(N + L) time, 
+        # where L is the number of links, as each disjoint set operation 
+        # runs in nearly O(1).
+        links = DisjointSet()
+        for parcel in parcels:
+            for companion in parcel.companions:
+                if companion in self.parcel_table:
+                    links.union(parcel.id, companion)
+
+        self.clusters = {}
+        members = {}
+        for parcel in parcels:
+            if parcel.id in links:
+                root = links.find(parcel.id)
+                if root not in members:
+                    members[root] = []
+                members[root].append(parcel)
+                self.clusters[parcel.id] = members[root]
+                parcel.linked = True
+
+    def get_cluster(self, parcel):
+        # This method returns the parcels that must be delivered along 
+        # with the given parcel, including the parcel itself, in O(1)
+        return self.clusters.get(parcel.id, [parcel])
+
+    def cluster_ready(self, parcel):
+        # This method checks that none of the parcels in the parcel's 
+        # cluster are still on their way to the hub or being held there 
+        # by is_ready(), as the cluster has to wait for them. It runs in 
+        # O(C), where C is the size of the cluster.
+        for linked_parcel in self.get_cluster(parcel):
+            if linked_parcel.status == Status.INFORMATION_RECEIVED:
+                return False
+            if linked_parcel.status == Status.AT_HUB \
+                    and not self.is_ready(linked_parcel):
+                return False
+        return True
+
+    def reorder_parcels(self, load, start=None):
+        # This method orders the load with a nearest-neighbour pass, 
+        # starting from node 1 unless another start node is given. It 
+        # runs in O(K^2), where K is the number of groups in the load.
+        groups = list(load)
         new_load = []
-        for i, dest in enumerate(route):
-            for parcel_group in load:
-                if parcel_group.get_destination() is dest:
-                    parcel_group.set_priority(len(load) + parcel_group.max_priority**2 - i)
-                    new_load.append(parcel_group)
+        curr_node = start
+        if curr_node is None:
+            curr_node = self.graph.get_node(1)
+        while len(groups) > 0:
+            # reading the whole row of distances from the graph at once, 
+            # then picking the closest group. Ties go to the first group 
+            # in the list. Groups are picked one at a time, rather than 
+            # by node, as a load can hold more than one group for the 
+            # same node when a cluster of linked parcels goes there.
+            distances = self.graph.distances_from(curr_node.id, \
+                [group.get_destination().id for group in groups])
+            next_group = None
+            shortest = float('inf')
+            for group, distance in zip(groups, distances):
+                if distance < shortest:
+                    next_group = group
+                    shortest = distance
+            next_group.set_priority(len(load) + next_group.max_priority**2 \
+                - len(new_load))
+            new_load.append(next_group)
+            groups.remove(next_group)
+            curr_node = next_group.get_destination()
+
         return new_load
 
+    def improve_route(self, truck, load, current_time=None):
+        # This method takes the load from reorder_parcels(), puts it in 
+        # the order that the truck will deliver it, and passes it to the 
+        # optimizer. The priorities of the groups are then reset so that 
+        # the truck follows the improved route. It runs in O(K log K), 
+        # plus the time taken by the optimizer, which is bounded by its 
+        # move and time limits.
+        if self.optimizer is None:
+            return load
+
+        hub = truck.hub_node
+        if hub is None:
+            hub = self.graph.get_node(1)
+        route, saved = self.optimize_route(hub, load, current_time, \
+            truck.speed)
+        self.miles_saved = self.miles_saved + saved
+        return route
+
+    def optimize_route(self, hub, load, current_time, speed):
+        # This method does the work for improve_route(), and returns the 
+        # improved route along with the miles saved. The truck pops groups 
+        # by priority, and groups with equal priority come out in the 
+        # order they were loaded.
+        route = sorted(load, key=lambda group: group.max_priority, \
+            reverse=True)
+        route, saved = self.optimizer.improve(hub, route, current_time, \
+            speed)
+
+        for i, group in enumerate(route):
+            group.set_priority(len(route) - i)
+        return route, saved
+
+    def plan_route(self, truck, load, current_time=None, reorder=True):
+        # This method puts a load in the order the truck will deliver it, 
+        # by building a nearest-neighbour route and then improving it. If 
+        # reorder is False, the load is already in order, and is only 
+        # improved.
+        if reorder:
+            load = self.reorder_parcels(load)
+        return self.improve_route(truck, load, current_time)
+
+    def plan_routes(self, trucks, loads, current_time=None, reorder=True):
+        # This method plans the route for each truck's load, as in 
+        # plan_route(). With more than one worker, the routes are planned 
+        # at the same time in the worker processes, so planning takes 
+        # about as long as the slowest route rather than all of them added 
+        # together. The results are collected in fleet order, so they are 
+        # the same as planning one route after another.
+        if self.workers is None or self.workers < 2 or len(trucks) < 2:
+            return [self.plan_route(truck, load, current_time, reorder) \
+                    for truck, load in zip(trucks, loads)]
+
+        pool = self.get_pool()
+        start = self.graph.get_node(1)
+        futures = []
+        for truck, load in zip(trucks, loads):
+            hub = truck.hub_node
+            if hub is None:
+                hub = start
+            stops = [Stop.from_group(i, group) for i, group in enumerate(load)]
+            futures.append(pool.submit(plan_stops, start.id, hub.id, stops, \
+                current_time, truck.speed, reorder))
+
+        routes = []
+        for load, future in zip(loads, futures):
+            order, saved = future.result()
+            route = []
+            for index, priority in order:
+                load[index].set_priority(priority)
+                route.append(load[index])
+            if self.optimizer is not None:
+                self.miles_saved = self.miles_saved + saved
+            routes.append(route)
+        return routes
+
+    def get_pool(self):
+        # This method starts the worker processes. The distance matrix is 
+        # copied once into shared memory, and each process is only given 
+        # its name, so every process reads the same pages rather than 
+        # getting a copy of its own. The workers get the optimizer's move 
+        # budget and, like the optimizer in this process, no time limit, 
+        # so they plan the same routes as planning them one at a time. It 
+        # runs in O(M^2), where M is the number of nodes.
+        if self.pool is None:
+            size = len(self.graph.matrix)
+            self.shared_distances = shared_memory.SharedMemory(create=True, \
+                size=max(1, size * size * 8))
+            view = self.shared_distances.buf[:size * size * 8].cast('d')
+            for i, row in enumerate(self.graph.matrix):
+                if getattr(row, 'typecode', getattr(row, 'format', None)) \
+                        != 'd':
+                    row = array('d', row)
+                view[i * size:(i + 1) * size] = row
+            view.release()
+
+            settings = None
+            if self.optimizer is not None:
+                settings = self.optimizer.max_moves
+            self.pool = ProcessPoolExecutor(self.workers, \
+                initializer=start_planner, \
+                initargs=(self.shared_distances.name, size, settings))
+        return self.pool
+
+    def close(self):
+        # stops the worker processes, if any were started, and frees the 
+        # shared distances
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+        if self.shared_distances is not None:
+            self.shared_distances.close()
+            self.shared_distances.unlink()
+            self.shared_distances = None
+
+    def reserve(self, truck, load):
+        # This method marks the parcels in the load as being on the truck 
+        # before the load is sent, so that the loads for the other trucks 
+        # don't pick them up. It runs in O(K), where K is the number of 
+        # parcels in the load.
+        for parcel_group in load:
+            for parcel in parcel_group.items():
+                parcel.set_status(Status.EN_ROUTE, truck.id)
+
     def send_to_truck(self, truck, load):
         # This method has a worst-case runtime of O(N) as it adds 
         # parcel groups to the truck
@@ -96,87 +353,134 @@ class Loader:
         
         return count
     
-    def check_duplicates(self, load, parcel):
-        # This method runs through the parcels in the load to make sure 
-        # there are no duplicate groups in the load
-        is_duplicate = False
+    def check_duplicates(self, loaded, parcel):
+        # This method checks whether the parcel is already part of the 
+        # load, using the set of IDs of the parcels that have been loaded. 
+        # It runs in O(1).
+        return parcel.id in loaded
 
-        for group in load:
-            if parcel in group.items():
-                is_duplicate = True
+    def add_to_load(self, load, loaded, parcel, limit=None):
+        # This method adds the group for the parcel's destination to the 
+        # load and records its parcels as loaded. It returns the number of 
+        # parcels that were added, and runs in O(K), where K is the number 
+        # of parcels in the group.
+        new_group = self.create_parcel_group(parcel, limit)
+        if new_group.count() == 0:
+            return 0
+
+        load.append(new_group)
+        for item in new_group.items():
+            loaded.add(item.id)
+        return new_group.count()
+
+    def add_cluster(self, load, loaded, parcel, room):
+        # This method adds the groups for the destinations of every parcel 
+        # in the parcel's cluster to the load, as one unit. If the cluster 
+        # doesn't fit in the room left in a load that already has parcels, 
+        # nothing is added and the cluster waits for another truck. The 
+        # groups are only filled with other parcels going to the same 
+        # places while there is room for them alongside the rest of the 
+        # cluster. It returns the number of parcels that were added, and 
+        # runs in O(C^2 + K), where C is the size of the cluster and K is 
+        # the number of parcels added.
+        left = [linked_parcel for linked_parcel in self.get_cluster(parcel) \
+                if self.is_ready(linked_parcel) \
+                and not self.check_duplicates(loaded, linked_parcel)]
+        if len(load) > 0 and len(left) > room:
+            return 0
+        added = 0
+        while len(left) > 0:
+            destination = left[0].delivery_node
+            here = [p for p in left if p.delivery_node is destination]
+            left = [p for p in left if p.delivery_node is not destination]
+            limit = max(len(here), room - added - len(left))
+            added = added + self.add_to_load(load, loaded, here[0], limit)
+        return added
 
-        return is_duplicate
-    
     def build_parcel_list(self, truck, deadline_parcels, remaining_parcels):
         # This method contains the bulk of the processing and sorting of 
-        # parcels. It has a worst-case runtime of O(N) when simplified, as 
-        # it runs through the list of parcels a finite number of times.
+        # parcels. It has a worst-case runtime of O(N), as it runs through 
+        # the list of parcels a finite number of times and keeps a running 
+        # count of the parcels in the load.
 
         remaining_parcels.sort(reverse=True)
-        
+
         load = []
-        for dl_parcel in deadline_parcels:  # looping through priority parcels
-            if self.get_load_count(load) < truck.get_max_capacity():
-                if not self.check_duplicates(load, dl_parcel):
-                    new_group = self.create_parcel_group(dl_parcel)
-                    load.append(new_group)
-
-                    if dl_parcel.linked:  # checking linked parcels
-                        for linked_parcel in self.get_all_linked_parcels():
-                            if not self.check_duplicates(load, linked_parcel):
-                                linked_group = self.create_parcel_group(linked_parcel)
-                                load.append(linked_group)
-
-        for parcel in remaining_parcels:  # looping through remaining parcels
-            if self.get_load_count(load) < truck.get_max_capacity():
-                if not self.check_duplicates(load, parcel):
-                    new_group = self.create_parcel_group(parcel)
-                    load.append(new_group)
-
-                    if parcel.linked:  # checking linked parcels
-                        for linked_parcel in self.get_all_linked_parcels():
-                            if not self.check_duplicates(load, linked_parcel):
-                                linked_group = self.create_parcel_group(linked_parcel)
-                                load.append(linked_group)
-        
+        loaded = set()  # IDs of the parcels in the load
+        count = 0
+        capacity = truck.get_max_capacity()
+        for parcel in deadline_parcels + remaining_parcels:
+            if count < capacity:
+                if not self.check_duplicates(loaded, parcel):
+                    if parcel.linked and not self.cluster_ready(parcel):
+                        continue
+                    elif parcel.linked:
+                        # the parcel's whole cluster is loaded at once, 
+                        # and nothing from any other cluster comes with it
+                        count = count + self.add_cluster(load, loaded, \
+                            parcel, capacity - count)
+                    else:
+                        count = count + self.add_to_load(load, loaded, \
+                            parcel, capacity)
+
         offset = 0
         # Here we make sure that the load count doesn't exceed the 
         # capacity of the trucks. We remove non-linked parcels so that 
         # we don't ignore the special instructions
-        while self.get_load_count(load) > truck.get_max_capacity():
+        while count > capacity and offset < len(load):
             if not load[offset].is_linked():  #making sure it's not linked
+                count = count - load[offset].count()
                 load.remove(load[offset])
             else:
                 offset = offset + 1
- 
+
+        # A cluster that is too big for a truck on its own has to be 
+        # split, as there is no way to keep it together
+        while count > capacity:
+            count = count - load.pop().count()
+
         return load
 
 
     def load(self):
-        # assigning priority and finding links between parcels
-        # this method runs in O(N) time
-        for parcel in self.parcel_table.items():
+        # assigning priority, finding clusters of linked parcels and 
+        # building the destination map. This method runs in O(N + L) 
+        # time, where L is the number of links between parcels.
+        self.destinations = {}
+        parcels = self.parcel_table.items()
+        for parcel in parcels:
             self.set_parcel_priority(parcel)
-            self.confirm_links(parcel)
+            self.add_destination(parcel)
+        self.find_clusters(parcels)
 
-    def run(self, trucks):
+    def run(self, trucks, current_time=None):
         # This method gathers the parcels that still need to be delivered 
         # and separates them out into lists that match the number of 
         # trucks that are currently available to be loaded. Additionally,
         # it calls the method that loads the parcels onto the trucks. 
+        # current_time is the time the trucks will leave the hub, which 
+        # is used to check deadlines while improving the routes. 
         # This method runs in O(N) time, where N is the number of trucks 
         # supplied in the trucks variable.
-        deadline_parcels = self.parcel_table.lookup(status='AT HUB', deadline='not None')
+        if len(trucks) == 0:
+            raise ValueError('there are no trucks to load')
+
+        deadline_parcels = self.get_deadline_parcels()
         dl_parcels_per_truck = (len(deadline_parcels) // len(trucks)) \
             + (len(deadline_parcels) % len(trucks))
 
         remaining_parcels = self.get_remaining_parcels()
 
-        if len(remaining_parcels) == 0:
+        # Linked parcels whose cluster has to wait can't be loaded either, 
+        # so the trucks finish if nothing else is left. They are woken 
+        # again when parcels arrive or addresses are corrected.
+        if not any(self.cluster_ready(parcel) for parcel \
+                in deadline_parcels + remaining_parcels):
             return 1
 
+        loads = []
         for truck in trucks:
-            deadline_parcels = self.parcel_table.lookup(status='AT HUB', deadline='not None')
+            deadline_parcels = self.get_deadline_parcels()
             remaining_parcels = self.get_remaining_parcels()
 
             dl_parcels_this_truck = []
@@ -187,7 +491,240 @@ class Loader:
                 dl_parcels_this_truck = deadline_parcels
 
             load = self.build_parcel_list(truck, dl_parcels_this_truck, remaining_parcels)
-            new_load = self.reorder_parcels(load)
+            self.reserve(truck, load)
+            loads.append(load)
+
+        # the routes are planned once every truck has its load, and then 
+        # the loads are sent to the trucks in the planned order
+        routes = self.plan_routes(trucks, loads, current_time)
+        for truck, new_load in zip(trucks, routes):
             self.send_to_truck(truck, new_load)
             
-        return 0
\ No newline at end of file
+        return 0
+
+
+    def plan_insertion(self, truck, group, current_time, required=False):
+        # This method works out where a group would go on a truck that 
+        # is already out, or just leaving the hub, using cheapest 
+        # insertion. The rest of the truck's route keeps its order, and a 
+        # truck that has left the hub keeps driving to the stop it is 
+        # heading for. It returns (extra miles, route, position), where 
+        # route is the truck's current route, or None if the group 
+        # doesn't fit on the truck or would make a deadline parcel late. 
+        # If required is True, e.g. because the group is already on the 
+        # truck, the cheapest position is used even if it is late. It 
+        # runs in O(K^2), where K is the number of stops on the truck.
+        if not required and (truck.load_count() + group.count() \
+                > truck.get_max_capacity()):
+            return None
+
+        hub = truck.hub_node
+        if hub is None:
+            hub = self.graph.get_node(1)
+        route = truck.get_route()
+        fixed = 0
+        start = hub
+        start_time = current_time
+        if not truck.is_leaving(current_time):
+            if len(route) == 0:
+                return None
+            fixed = 1
+            start = route[0].get_destination()
+            start_time = truck.get_arrival_time()
+
+        position, extra = self.timetable.cheapest_insertion(start, hub, \
+            route[fixed:], group, start_time, truck.speed, required)
+        if position is None:
+            return None
+        return extra, route, position + fixed
+
+    def insert_group(self, truck, group, route, position, current_time):
+        # This method puts the group on the truck at the position found 
+        # by plan_insertion(). If the stop next to it goes to the same 
+        # place, the parcels join that stop instead, which changes none 
+        # of the arrival times. A truck that is just leaving the hub is 
+        # sent to its new first stop. It runs in O(K log K + N), where N 
+        # is the number of parcels in the group.
+        route = list(route)
+        target = None
+        for i in (position - 1, position):
+            if 0 <= i < len(route) and \
+                    route[i].get_destination() is group.get_destination():
+                target = route[i]
+                break
+
+        if target is None:
+            route.insert(position, group)
+        else:
+            # the stop is reloaded so that the truck's count stays right
+            truck.cargo.remove(target)
+            for parcel in group.items():
+                target.add_parcel(parcel)
+
+        truck.set_route(route)
+        if truck.is_leaving(current_time):
+            truck.start(current_time)
+
+    def insert_parcels(self, trucks, parcels, current_time):
+        # This method adds parcels that have just reached the hub to the 
+        # given trucks, which should be the trucks leaving the hub at 
+        # current_time, without building their loads again. The parcels 
+        # are grouped by destination, and each group goes to the truck 
+        # where it adds the fewest miles without breaking a deadline. A 
+        # group is only added if that costs fewer miles than the drive out 
+        # to it from the hub, as it is usually cheaper to take it on a 
+        # later load otherwise. Linked parcels, and groups that don't fit 
+        # anywhere, are left at the hub for the next load. It returns the 
+        # trucks whose routes changed, and runs in O(G * T * K^2), where G 
+        # is the number of groups and T is the number of trucks, so only 
+        # the routes of the given trucks are touched.
+        groups = {}
+        for parcel in parcels:
+            if self.is_ready(parcel) and not parcel.linked:
+                if parcel.delivery_node not in groups:
+                    groups[parcel.delivery_node] = ParcelGroup()
+                groups[parcel.delivery_node].add_parcel(parcel)
+
+        changed = []
+        hub = self.graph.get_node(1)
+        for group in groups.values():
+            best = None
+            detour = self.graph.distance(hub.id, group.get_destination().id)
+            required_trucks = [parcel.required_truck for parcel \
+                in group.items() if parcel.required_truck is not None]
+            for truck in trucks:
+                if any(id_ != truck.id for id_ in required_trucks):
+                    continue
+                plan = self.plan_insertion(truck, group, current_time)
+                if plan is not None and plan[0] <= detour \
+                        and (best is None or plan[0] < best[0]):
+                    best = plan + (truck,)
+            if best is not None:
+                extra, route, position, truck = best
+                self.insert_group(truck, group, route, position, \
+                    current_time)
+                if truck not in changed:
+                    changed.append(truck)
+        return changed
+
+    def readdress(self, parcel, address, zip_, trucks, current_time):
+        # This method corrects a parcel's address during the day. A 
+        # parcel that is still at the hub only needs its destination 
+        # changed, and one that has already been delivered is left 
+        # alone. A parcel that is on a truck is taken off its old stop 
+        # and put back into the same truck's route by cheapest insertion, 
+        # so no other truck is touched. It raises a ValueError if the 
+        # address isn't in the graph, and returns the trucks whose routes 
+        # changed. It runs in O(K^2 + T), where T is the number of trucks.
+        if self.graph.get_node_by_address(address, zip_) is None:
+            raise ValueError('unknown address: ' + address + ' ' + zip_)
+        if parcel.status in (Status.DELIVERED, Status.DELIVERED_LATE):
+            return []
+
+        self.remove_destination(parcel)
+        parcel.set_address(address, zip_, self.graph)
+        self.add_destination(parcel)
+        if parcel.status != Status.EN_ROUTE:
+            return []
+
+        truck = None
+        for candidate in trucks:
+            if candidate.id == parcel.truck_id:
+                truck = candidate
+        if truck is None:
+            return []
+
+        route = truck.get_route()
+        for i, old_group in enumerate(route):
+            if parcel in old_group.items():
+                truck.cargo.remove(old_group)
+                old_group.remove_parcel(parcel)
+                # the stop the truck is driving to stays on the route, 
+                # even if nothing is left to deliver there
+                if old_group.count() > 0 or \
+                        (i == 0 and not truck.is_leaving(current_time)):
+                    truck.cargo.push(old_group)
+                break
+
+        new_group = ParcelGroup()
+        new_group.add_parcel(parcel)
+        extra, route, position = self.plan_insertion(truck, new_group, \
+            current_time, True)
+        self.insert_group(truck, new_group, route, position, current_time)
+        return [truck]
+
+
+class Stop:
+    # A Stop stands in for a ParcelGroup while its route is planned in a 
+    # worker process. It only holds what the planner needs: the position 
+    # of the group in the load, its destination, its priority and its 
+    # earliest deadline. A Stop is its own destination and its own only 
+    # parcel, so the planner can treat it just like a group, and it can 
+    # be sent between processes without the parcels, table or graph.
+
+    # init runs in O(1)
+    def __init__(self, index, id_, priority, deadline):
+        self.index = index
+        self.id = id_
+        self.max_priority = priority
+        self.delivery_deadline = deadline
+
+    @classmethod
+    def from_group(cls, index, group):
+        # this method runs in O(P), where P is the number of parcels in 
+        # the group
+        deadline = None
+        for parcel in group.items():
+            if parcel.delivery_deadline is not None:
+                if deadline is None or parcel.delivery_deadline < deadline:
+                    deadline = parcel.delivery_deadline
+        return cls(index, group.get_destination().id, group.max_priority, \
+                   deadline)
+
+    def get_destination(self):
+        return self
+
+    def items(self):
+        return [self]
+
+    def set_priority(self, value):
+        self.max_priority = value
+
+
+# the Loader used by each worker process to plan routes, and the shared 
+# memory holding its distances, set up by start_planner() when the 
+# process starts
+planner = None
+distances = None
+
+
+def start_planner(name, size, settings):
+    # This function sets up a worker process. The distances are viewed 
+    # as rows of the shared memory block with the given name rather than 
+    # copied, and settings holds the optimizer's move budget, or None if 
+    # routes aren't improved. It runs in O(M), where M is the number of 
+    # nodes.
+    global planner, distances
+    distances = shared_memory.SharedMemory(name=name)
+    view = distances.buf[:size * size * 8].cast('d')
+    graph = Graph()
+    graph.matrix = [view[i * size:(i + 1) * size] for i in range(size)]
+    planner = Loader(None, graph)
+    if settings is None:
+        planner.optimizer = None
+    else:
+        planner.optimizer = RouteOptimizer(graph, settings, None)
+
+
+def plan_stops(start_id, hub_id, stops, current_time, speed, reorder=True):
+    # This function plans one route in a worker process, the same way as 
+    # Loader.plan_route(). It returns the index and final priority of each 
+    # stop in the order they will be visited, and the miles saved.
+    route = stops
+    if reorder:
+        route = planner.reorder_parcels(stops, Stop(None, start_id, 0, None))
+    saved = 0
+    if planner.optimizer is not None:
+        route, saved = planner.optimize_route(Stop(None, hub_id, 0, None), \
+            route, current_time, speed)
+    return [(stop.index, stop.max_priority) for stop in route], saved
@@ -11,124 +11,87 @@ from __future__ import print_function
 import os
 #from multiprocessing.process import BaseProcess as Process
 #from multiprocessing.synchronize import Lock
-from multiprocessing import Process, Lock, Queue
+from multiprocessing import Process, Lock
 import time
 
+from batch import start_day, check_corrections, report_corrections, \
+    PLANNERS
+from clock import Clock, format_time
+from events import EventEngine
+from profiler import Profiler
+from publisher import StateChannel
 from table import Table
 import parcel
+from parcel import Status
 import graph
-from truck import Truck
-import loader
+from truck import Truck, build_fleet
 
 # IMPORTANT: IF YOU ARE USING WINDOWS, PLEASE CHANGE THE 
 # VALUE OF clear_function TO "cls" INSTEAD OF "clear"!!!
 clear_function = "clear"
 clear = lambda: os.system(clear_function)
 
+# Setting fast_forward to True skips the one-minute-at-a-time display 
+# and jumps straight from one event to the next, finishing the whole 
+# day almost instantly.
+fast_forward = False
 
-# The point of the following two classes is to be able to throw 
-# a custom Error when the Clock class tries to enter an invalid state
-class Error(Exception):
-    """Base Error class that inherits from Exception"""
-    # pass executes in O(1) time
-    pass
+# Number of trucks sent out from the hub
+fleet_size = 2
 
+# Number of processes used to plan the routes of trucks that are 
+# loaded at the same time. None plans them one after another.
+planner_workers = None
 
-class StateError(Error):
-    """Error thrown when clock is sent to an invalid state"""
-    # this init method executes in O(1) time
-    def __init__(self, message):
-        self.message = message
+# How the trucks are loaded: 'greedy' fills each truck by priority and 
+# then routes it, 'savings' plans the routes and loads together
+planner = 'greedy'
 
+# Setting shortest_paths to True lets trucks drive through other 
+# addresses when that is shorter than the direct distance between two 
+# stops, as it often is on real roads.
+shortest_paths = False
 
-class Clock:
-    """Clock class that handles the time keeping for the 
-    Simulator class.
-    """
+# Setting profile_output to a file name times each phase of the 
+# simulation and writes a report to that file once the day is over.
+profile_output = None
+
+# Addresses that are corrected during the day, as (parcel ID, time in 
+# minutes since midnight, address, zip) tuples. Parcels marked with a 
+# wrong address stay at the hub until their address is corrected. 
+# Parcel 9's address is corrected at 10:20 AM.
+address_corrections = [(9, 620, '410 S State St', '84111')]
 
-    # The Clock class has four methods, excluding its init() method. 
-    # Each of these methods are designed to simulate the passage of time 
-    # during our simulation. With each call of the tick() method, the 
-    # clock will update and pass the new time value on to the 
-    # Simulation class, which will inform all other components of our 
-    # simulation of the new current_time value so that each component 
-    # can update its own state and keep the simulation synced.
-
-    # __init__ here executes in O(1) time
-    def __init__(self, start_time=800, interval=1):
-        self.start_time = start_time
-        self.interval = interval
-
-        self.current_time = None
-        self.running = False
-        self.paused = False
-    
-    # because there are no loops, only a series of statements, this method
-    # will run in O(1) time because only a finite number of statements will 
-    # be executed
-    def start(self):
-        if not self.running:
-            self.running = True
-            if not self.paused:
-                self.current_time = self.start_time
-            else:
-                self.paused = False
-        else:
-            raise StateError('Clock is already running!')
-    
-    # stop runs in O(1) for the same reason as above
-    def stop(self):
-        if self.running:
-            self.running = False
-            self.paused = False
-        else:
-            raise StateError('Clock is not running!')
-    
-    # tick has a finite number of statements and no loops, so it will 
-    # run in O(1) time
-    def tick(self):
-        if self.running and not self.paused:
-            self.current_time = self.current_time + self.interval
-        else:
-            raise StateError('Clock is not running or paused!')
-        
-        if str(self.current_time)[-2:] == '60':
-            self.current_time = self.current_time + 40
-    
-    # pause runs in O(1) time
-    def pause(self):
-        if self.running:
-            self.paused = True
-        else:
-            raise StateError('Clock is not running!')
 
 # Here we initialize a few objects that we will need for the simulation
-# The Queue and Lock objects will be used for syncronization between 
-# our two threads to ensure the integrity of the reported data.
+# The StateChannel and Lock objects will be used for syncronization 
+# between our two threads to ensure the integrity of the reported data. 
+# The channel only carries the parcels that change, and the parent 
+# applies them to its own copy of my_table when the user asks for it.
 # The Graph and Table objects are custom data structures that have 
 # been created for use with this algorithm.
-q = Queue()
+channel = StateChannel()
 lock = Lock()
 my_graph = graph.Graph()
-my_table = Table()
+my_table = Table(indexes=('status', 'delivery_node', 'delivery_deadline', \
+                          'zip'))
 
 # Loading nodes and parcels into memory
 graph.load('node_list.csv', 'distance_list.csv', my_graph)
-parcel.load('parcel_list.csv', my_table)
-
-# Initializing our trucks
-truck_1 = Truck(1, 1, hub_node=my_graph.get_node(1))
-truck_2 = Truck(2, 2, hub_node=my_graph.get_node(1))
-truck_3 = Truck()  # we don't have a driver for this one...
+if shortest_paths:
+    my_graph.shortest_paths()
+parcel.report_errors('parcel_list.csv', \
+    parcel.load('parcel_list.csv', my_table))
+check_corrections(my_graph, address_corrections, my_table)
 
-# List for holding truck objects
-trucks = [truck_1, truck_2]
+# Initializing our trucks, one driver each
+trucks = build_fleet(fleet_size, my_graph.get_node(1))
 
 # This Loader object will handle sorting the parcels between 
 # the trucks so that we can get an even spread on them and 
 # ensure that no truck gets bogged down by too many 
 # high-priority deliveries
-my_loader = loader.Loader(my_table, my_graph)
+my_loader = PLANNERS[planner](my_table, my_graph, planner_workers)
 
 
 class Simulator:
@@ -148,30 +111,33 @@ class Simulator:
     # init runs in O(1)
     def __init__(self, clock):
         self.clock = clock
+        self.engine = None
+        self.profiler = None
     
     # This method runs in O(1) time
     def get_current_time(self):
         return self.clock.current_time
 
     def run(self):
-        self.clock.start()  #starting clock
-
-        # This loop runs in O(N) time as it loops through 
-        # each parcel in our table
-        for p in my_table.items():
-            p.set_node(my_graph)
-            p.parse_special_instructions()
-            if not p.delayed:
-                p.set_status('AT HUB')
+        if profile_output is not None:
+            self.start_profiler()
 
-        my_loader.load()  #initializing loader
-        my_loader.run([truck_1, truck_2])  #sending trucks to loader
-        #truck.load(truck_3, my_table)
-
-        # starting each truck and giving them the current_time
-        truck_1.start(self.clock.current_time)
-        truck_2.start(self.clock.current_time)
-        #truck_3.start(self.clock.current_time)  # no driver
+        self.clock.start()  #starting clock
+        channel.watch(my_table)  # publishing parcel changes from here on
+
+        # getting the parcels and trucks ready for the day. This runs 
+        # in O(N) time as it loops through each parcel in our table
+        unresolved = start_day(my_graph, my_table, my_loader, trucks, \
+            self.clock.current_time)
+        parcel.report_unresolved('parcel_list.csv', unresolved)
+
+        # The event engine works out when each truck will next arrive 
+        # somewhere and when delayed parcels will reach the hub, so 
+        # nothing needs to be checked on the minutes in between.
+        self.engine = EventEngine(self.clock, trucks, my_loader, my_table)
+        self.engine.start()
+        for parcel_id, time_, address, zip_ in address_corrections:
+            self.engine.correct_address(time_, parcel_id, address, zip_)
 
         # Because this is technically an infinite loop, it is 
         # impossible to define the runtime complexity of this 
@@ -182,67 +148,91 @@ class Simulator:
         # that will occur, or how many cycles will have passed 
         # by that time. With that in mind, the interior of this 
         # loop will execute in O(1) time because it is a finite 
-        # number of simple statements and function calls.
+        # number of simple statements and function calls. In 
+        # fast-forward mode, the loop ends once there are no 
+        # events left.
         while True:
             lock.acquire()
             try:
                 self.update()
             finally:
-                if not q.empty():
-                    q.get(False)
-                total_miles = truck_1.get_total_miles() + truck_2.get_total_miles()
-                q.put((self.clock.current_time, my_table, total_miles))
+                total_miles = 0
+                for truck in trucks:
+                    total_miles = total_miles + truck.get_total_miles()
+                channel.publish(self.clock.current_time, total_miles, \
+                    my_loader.miles_saved)
                 lock.release()
+            if self.profiler is not None and self.engine.is_finished():
+                self.stop_profiler()
+            if fast_forward:
+                if self.engine.is_finished():
+                    self.print_status()
+                    report_corrections(self.engine.failed_corrections)
+                    break
+            else:
                 time.sleep(0.05)
 
+    def start_profiler(self):
+        # This method starts timing each phase of the simulation, 
+        # including the simulator's own updates and console redraws
+        self.profiler = Profiler()
+        self.profiler.wrap(Simulator, 'update', 'simulator.update')
+        self.profiler.wrap(Simulator, 'print_status', 'simulator.redraw')
+        self.profiler.install()
+
+    def stop_profiler(self):
+        # This method stops the profiler and writes its report
+        self.profiler.uninstall()
+        with open(profile_output, 'w', encoding='utf-8') as out:
+            self.profiler.report(out)
+        self.profiler = None
+
     def update(self):
-        # This method handles the bulk of the function calls and logic 
-        # of the program. Overall, the method runs in O(N) time, which 
-        # will be discussed in inline comments further down.
+        # This method moves the simulation forward. Normally the clock 
+        # ticks one minute at a time so that the user can follow along, 
+        # and the engine handles any events that are due. In fast-forward 
+        # mode, the clock jumps straight to the next event. Each call 
+        # runs in O(T + P), where T is the number of trucks that arrive 
+        # somewhere and P is the number of parcels that reach the hub.
+        if fast_forward:
+            next_time = self.engine.next_event_time()
+            if next_time is not None:
+                self.engine.advance_to(next_time)
+            return
 
         # updating clock
         if self.clock.running:
             self.clock.tick()
 
-        # updating trucks
-        truck_1_response = truck_1.update(self.clock.current_time)
-        truck_2_response = truck_2.update(self.clock.current_time)
-
-        # checking responses from trucks
-        if truck_1_response == 1:
-            truck_1_response = my_loader.run([truck_1])
-            truck_1.start(self.clock.current_time)
-        if truck_2_response == 1:
-            truck_2_response = my_loader.run([truck_2])
-            truck_2.start(self.clock.current_time)
-
-        if truck_1_response == 1:
-            truck_1.finish_day()
-        if truck_2_response == 1:
-            truck_2.finish_day()
-
-        # This block has a worst-case runtime of O(N)
-        for p in my_table.lookup(status='INFORMATION RECEIVED'):
-            if self.clock.current_time >= p.arrival_time:
-                p.set_status('AT HUB')
+        # updating trucks and parcels
+        self.engine.advance_to(self.clock.current_time)
 
         clear()  # clears console history to reduce clutter
-
-        # printing information to the console to update the user
-        print('Time: ' + str(self.clock.current_time))
+        self.print_status()
+
+    def print_status(self):
+        # printing information to the console to update the user. Each 
+        # truck that is still working gets its own lines, and the ones 
+        # that are done for the day are counted, so this runs in O(T), 
+        # where T is the size of the fleet.
+        print('Time: ' + format_time(self.clock.current_time))
         print()
-        if not truck_1.is_finished():
-            print('Truck 1 en route to ' + str(truck_1.next_node) \
-                + ', will arrive at ' + str(truck_1.get_arrival_time()))
-            print('Load: ' + str(truck_1.load_count()) + '/' + str(truck_1.capacity))
-        else:
-            print('All parcels have left the hub. Truck 1 is done for the day.')
-        if not truck_2.is_finished():
-            print('Truck 2 en route to ' + str(truck_2.next_node) \
-                + ', will arrive at ' + str(truck_2.get_arrival_time()))
-            print('Load: ' + str(truck_2.load_count()) + '/' + str(truck_2.capacity))
-        else:
-            print('All parcels have left the hub. Truck 2 is done for the day.')
+        finished = 0
+        for truck in trucks:
+            if truck.is_finished():
+                finished = finished + 1
+            elif truck.get_state() == Truck.RETURNING:
+                print('Truck ' + str(truck.id) + ' returning to the hub, ' \
+                    + 'will arrive at ' + format_time(truck.get_arrival_time()))
+            else:
+                print('Truck ' + str(truck.id) + ' en route to ' \
+                    + str(truck.next_node) + ', will arrive at ' \
+                    + format_time(truck.get_arrival_time()))
+                print('Load: ' + str(truck.load_count()) + '/' \
+                    + str(truck.capacity))
+        if finished > 0:
+            print('All parcels have left the hub. ' + str(finished) + ' of ' \
+                + str(len(trucks)) + ' trucks are done for the day.')
 
         print('Enter 1 to pause or 0 to exit: ')
 
@@ -253,7 +243,7 @@ class Controller:
     """
 
     # The Controller class spawns the child thread containing the 
-    # Simulator object. It also syncs up using the Queue object 
+    # Simulator object. It also syncs up using the StateChannel object 
     # to ensure the integrity of our data that is being passed 
     # back and forth between the two threads. All of the methods 
     # in this class run in O(1) time because they simply call other 
@@ -308,12 +298,15 @@ def main():
             my_controller.resume()
             val = None
         elif val == 'P' or val == 'p':
-            current_time, my_table, total_miles = q.get()
-            print('Current Time: ' + str(current_time))
+            current_time, total_miles, miles_saved = \
+                channel.receive(my_table)
+            print('Current Time: ' + format_time(current_time))
             my_table.print_all()
             print()
             print()
             print('Total miles: %.2f' % round(total_miles, 2))
+            print('Miles saved by route improvement: %.2f' \
+                % round(miles_saved, 2))
             print()
             input('Press enter to continue the simulation.')
             my_controller.resume()
@@ -326,17 +319,16 @@ main()  # calling main() to begin the program
 def test():
     for p in my_table.items():
         p.set_node(my_graph)
-        p.parse_special_instructions()
         if not p.delayed:
-            p.set_status('AT HUB')
+            p.set_status(Status.AT_HUB)
 
     my_loader.load()
-    my_loader.run([truck_1, truck_2])
+    my_loader.run(trucks)
 
-    truck_1.start(800)
-    truck_2.start(800)
+    for truck in trucks:
+        truck.start(480)
 
-    truck_1.update(801)
-    truck_2.update(801)
+    for truck in trucks:
+        truck.update(481)
 
 #test()
\ No newline at end of file
@@ -1,6 +1,85 @@
 # C950 - Anthony Utt - autt3 - ID#000854797
 
+import csv
+from enum import IntEnum
+import functools
 from random import randint
+import re
+import sys
+
+from clock import parse_time
+
+
+class Status(IntEnum):
+    """Status codes for parcels"""
+
+    # Statuses are stored and compared as small integers. The truck 
+    # carrying a parcel is kept in its own attribute rather than in the 
+    # status, and the text shown to the user is only built by 
+    # format_status() when it is printed.
+    INFORMATION_RECEIVED = 0
+    AT_HUB = 1
+    EN_ROUTE = 2
+    DELIVERED = 3
+    DELIVERED_LATE = 4
+
+
+# the text shown for each status
+STATUS_NAMES = {
+    Status.INFORMATION_RECEIVED: 'INFORMATION RECEIVED',
+    Status.AT_HUB: 'AT HUB',
+    Status.EN_ROUTE: 'EN ROUTE',
+    Status.DELIVERED: 'DELIVERED',
+    Status.DELIVERED_LATE: 'DELIVERED LATE',
+}
+
+
+def format_status(status, truck_id=None):
+    # This function returns the text shown for a status, e.g. 
+    # 'EN ROUTE - TRUCK 2', in O(1)
+    if status == Status.EN_ROUTE and truck_id is not None:
+        return STATUS_NAMES[status] + ' - TRUCK ' + str(truck_id)
+    return STATUS_NAMES[status]
+
+
+# The grammar of the special instructions. Each rule is tried in order 
+# and the first one that matches decides what the instruction means, so 
+# an instruction only ever sets one kind of constraint.
+INSTRUCTION_RULES = [
+    ('delayed', re.compile(r'DELAYED.*?(\d{1,2}:\d{2})(?:.*?([AP]M))?', \
+        re.IGNORECASE)),
+    ('truck', re.compile(r'TRUCK\D*(\d+)\s*$', re.IGNORECASE)),
+    ('wrong_address', re.compile(r'WRONG ADDRESS', re.IGNORECASE)),
+    ('companions', re.compile(r'DELIVERED WITH\s*(.*)$', re.IGNORECASE)),
+]
+NUMBER = re.compile(r'\d+')
+
+
+@functools.lru_cache(maxsize=None)
+def parse_instruction(instr):
+    """Parses the text of one special instruction."""
+
+    # This function returns a (kind, value) tuple for the instruction, 
+    # where kind is the name of the rule that matched, or (None, None) if 
+    # none of them did. The value is the arrival time for delays, the 
+    # truck number, or a tuple of parcel IDs for companions. Results are 
+    # cached, as most instructions are repeated across many parcels, so 
+    # each distinct instruction is only parsed once. It runs in O(L), 
+    # where L is the length of the instruction.
+    for kind, pattern in INSTRUCTION_RULES:
+        match = pattern.search(instr)
+        if match is None:
+            continue
+        if kind == 'delayed':
+            meridiem = (match.group(2) or 'AM').upper()
+            return kind, parse_time(match.group(1) + ' ' + meridiem)
+        if kind == 'truck':
+            return kind, int(match.group(1))
+        if kind == 'companions':
+            return kind, tuple(int(n) for n in NUMBER.findall(match.group(1)))
+        return kind, True
+    return None, None
+
 
 class Parcel:
     """Class that contains information about parcels"""
@@ -10,30 +89,37 @@ class Parcel:
     # class has a runtime complexity of O(1) because there are a finite 
     # number of statements to be executed for each parcel.
 
+    # Parcels are the most numerous objects in the system, so their 
+    # attributes are kept in fixed slots rather than a dictionary for 
+    # each parcel, and the strings that many parcels share (addresses, 
+    # cities, special instructions and so on) are interned so that each 
+    # distinct value is only stored once. Statuses are small Status codes 
+    # rather than strings. New attributes have to be added here.
+    __slots__ = ('id', 'address', 'city', 'state', 'zip', 'mass', \
+                 'special_instructions', 'status', 'delivery_deadline', \
+                 'priority', 'delivery_node', 'delayed', 'arrival_time', \
+                 'required_truck', 'wrong_address', 'companion_parcels', \
+                 'companions', 'linked', 'delivery_time', 'truck_id', \
+                 'table')
+
     def __init__(self, id_, address, city, state, zip_, \
                 deadline, mass, instr, status):
 
         # basic attributes of each parcel
         self.id = int(id_)
-        self.address = address
-        self.city = city
-        self.state = state
-        self.zip = zip_
-        self.mass = mass
-        self.special_instructions = instr
+        self.address = sys.intern(address)
+        self.city = sys.intern(city)
+        self.state = sys.intern(state)
+        self.zip = sys.intern(zip_)
+        self.mass = sys.intern(mass)
+        self.special_instructions = sys.intern(instr)
         self.status = status
 
-        # Parsing the delivery time
+        # Parsing the delivery time into minutes since midnight
         if deadline == 'EOD':
             self.delivery_deadline = None
         else:
-            if 'PM' in deadline:
-                offset = 1200  # for 24-hour time
-            else:
-                offset = 0
-        
-            self.delivery_deadline = int(deadline.replace(' AM', '')\
-                .replace(' PM', '').replace(':', '')) + offset
+            self.delivery_deadline = parse_time(deadline)
 
         # priority is set to negative infinity here because that is the 
         # the smallest possible number. Our priority queue will deliver 
@@ -54,15 +140,58 @@ class Parcel:
         self.required_truck = None
         self.wrong_address = None
         self.companion_parcels = None
-        self.companions = []
+        self.companions = ()  # IDs of the parcels to deliver it with
         self.linked = False
 
-    def set_status(self, status):
+        # time the parcel was delivered, set by the truck on delivery
+        self.delivery_time = None
+
+        # ID of the truck the parcel is on, if it has left the hub
+        self.truck_id = None
+
+        # the Table holding this parcel, assigned by the table if it keeps 
+        # secondary indexes. Setters that change an indexed attribute 
+        # let the table know so that its indexes stay in sync.
+        self.table = None
+
+    def set_status(self, status, truck_id=None):
+        # status is one of the Status codes, and truck_id is the truck 
+        # that is carrying the parcel, if any
+        if self.table is not None:
+            self.table.update_index(self.id, 'status', self.status, status)
         self.status = status  # updating status
 
+        # the truck is kept after delivery, so that it is known which 
+        # truck delivered the parcel, and dropped if it is back at the hub
+        if truck_id is not None or status == Status.AT_HUB \
+                or status == Status.INFORMATION_RECEIVED:
+            self.truck_id = truck_id
+
+    def get_status_string(self):
+        # returns the status as it is shown to the user
+        return format_status(self.status, self.truck_id)
+
+    def set_delivery_time(self, time):
+        self.delivery_time = time  # recording when it was delivered
+
     def set_node(self, graph):
         # this function gets the delivery node using the graph object
-        self.delivery_node = graph.get_node_by_address(self.address, self.zip)
+        node = graph.get_node_by_address(self.address, self.zip)
+        if self.table is not None:
+            self.table.update_index(self.id, 'delivery_node', \
+                self.delivery_node, node)
+        self.delivery_node = node
+
+    def set_address(self, address, zip_, graph):
+        # This function replaces a wrong address with the right one, 
+        # e.g. once it has been corrected during the day, and finds the 
+        # new delivery node. It runs in O(1).
+        if self.table is not None:
+            self.table.update_index(self.id, 'zip', self.zip, zip_)
+        self.address = sys.intern(address)
+        self.zip = sys.intern(zip_)
+        self.wrong_address = False
+        self.set_node(graph)
 
     def set_priority(self, num):
         self.priority = num  # setting priority for the parcel
@@ -70,44 +199,22 @@ class Parcel:
     def parse_special_instructions(self):
         """Parses special instructions included in parcel file."""
 
-        # This function parses the special instructions that are assigned 
-        # to each parcel. Since the logic is a series of if/else blocks 
-        # and there are no loops in the function, it has a runtime of 
-        # O(1).
-
-        instr = self.special_instructions.upper()
-
-        # These sections are self-evident. Parsing into instr and then 
-        # assigning values to the necessary attributes above.
-        if 'DELAYED' in instr:
+        # This function sets the attributes for the constraint given in 
+        # the parcel's special instructions, using parse_instruction(). 
+        # It runs in O(1) once the instruction has been parsed, and can 
+        # safely be called more than once.
+        kind, value = parse_instruction(self.special_instructions)
+        if kind == 'delayed':
             self.delayed = True
-
-            words = instr.split()
-            for word in words:  #string manipulation to get the right time
-                if ':' in word:
-                    if 'PM' in instr:
-                        offset = 1200
-                    else:
-                        offset = 0
-                
-                    self.arrival_time = int(word.replace(':', '')) + offset
-        elif 'TRUCK' in instr:  #setting required truck
-            words = instr.split()
-            self.required_truck = int(words[-1])
-        elif 'WRONG ADDRESS' in instr:  #setting wrong address
+            self.arrival_time = value
+        elif kind == 'truck':  #setting required truck
+            self.required_truck = value
+        elif kind == 'wrong_address':  #setting wrong address
             self.wrong_address = True
-        elif 'DELIVERED WITH' in instr:  #setting links
+        elif kind == 'companions':  #setting links
             self.companion_parcels = True
             self.linked = True
-
-            words = instr.split()
-            next_ = False
-            for word in words:  #string manipulation to get all links
-                if next_:
-                    self.companions.append(int(word.replace(',', '')))
-            
-                if 'WITH' in word:
-                    next_ = True
+            self.companions = value
 
     # standard operator overrides
     def __lt__(self, other):
@@ -141,31 +248,94 @@ class Parcel:
         return False
 
     def __str__(self):
-        value = 'Parcel ' + str(self.id) + '\t\t[' + self.status + ']'
-        if self.status == 'AT HUB' or self.status == 'DELIVERED':
+        value = 'Parcel ' + str(self.id) + '\t\t[' \
+            + self.get_status_string() + ']'
+        if self.status == Status.AT_HUB or self.status == Status.DELIVERED:
             value = value + '\t'
         return value
 
 
-def load(path_to_file, table):
+def read_parcels(path_to_file, errors=None):
+    """Reads parcels from CSV parcel file one row at a time."""
+
+    # This generator reads the parcel file row by row and yields a parcel 
+    # object for each row, so only one row needs to be in memory at a 
+    # time. The csv module handles quoted fields, so special instructions 
+    # like "Must be delivered with 15, 19" stay in one piece. Rows that 
+    # can't be turned into a parcel are skipped, and if an errors list is 
+    # given, a (line number, message) tuple is added to it for each one. 
+    # It has a runtime complexity of O(N), where N is the number of lines 
+    # in the parcel file.
+
+    with open(path_to_file, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if len(row) == 0:
+                continue
+            try:
+                if len(row) != 8:
+                    raise ValueError('expected 8 fields, found ' \
+                                     + str(len(row)))
+
+                # all arguments are being passed as strings
+                new_parcel = Parcel(row[0], row[1], row[2], row[3], row[4], \
+                                    row[5], row[6], row[7].strip(), \
+                                    Status.INFORMATION_RECEIVED)
+                new_parcel.parse_special_instructions()
+            except ValueError as error:
+                if errors is not None:
+                    errors.append((reader.line_num, str(error)))
+                continue
+
+            yield new_parcel
+
+
+def load(path_to_file, table, chunk_size=1000):
     """Loads parcels from CSV parcel file."""
 
-    # This method reads through the parcel file and creates a parcel 
-    # object for each line in the file. It has a runtime complexity of 
-    # O(N), where N is the number of lines in the parcel file.
+    # This method reads through the parcel file and inserts a parcel 
+    # object for each line in the file. Parcels are gathered into chunks 
+    # of chunk_size and inserted together, so the table only has to make 
+    # room once per chunk. It returns a list of (line number, message) 
+    # tuples for any rows that couldn't be read. It has a runtime 
+    # complexity of O(N), where N is the number of lines in the parcel 
+    # file, and only holds one chunk of parcels in memory at a time 
+    # outside of the table.
+
+    errors = []
+    chunk = []
+    for new_parcel in read_parcels(path_to_file, errors):
+        chunk.append((new_parcel.id, new_parcel))
+        if len(chunk) >= chunk_size:
+            table.insert_many(chunk)
+            chunk = []
+
+    if len(chunk) > 0:
+        table.insert_many(chunk)
+
+    return errors
 
-    f = open(path_to_file, 'r', encoding='utf-8')
-    content = f.readlines()
 
-    for line in content:
-        # here we are doing some string manipulation to parse out the 
-        # lines in the parcel file
-        split_line = line.split(',')
+def report_errors(path_to_file, errors, out=None):
+    # This function prints each row that couldn't be read, as returned 
+    # by load() or collected by read_parcels(), with its line number. 
+    # The rows go to standard error unless out is given. It runs in 
+    # O(E), where E is the number of errors.
+    if out is None:
+        out = sys.stderr
+    for line_number, message in errors:
+        out.write('%s:%d: skipped parcel row: %s\n' % (path_to_file, \
+            line_number, message))
 
-        # all arguments are being passed as strings
-        new_parcel = Parcel(split_line[0], split_line[1], split_line[2], \
-                            split_line[3], split_line[4], split_line[5], \
-                            split_line[6], split_line[7].strip(), \
-                            'INFORMATION RECEIVED')
 
-        table.insert(new_parcel.id, new_parcel)
\ No newline at end of file
+def report_unresolved(path_to_file, parcels, out=None):
+    # This function prints each parcel whose address couldn't be found 
+    # in the graph, as returned by Graph.resolve_nodes(). These parcels 
+    # stay at the hub, so the rest of the day can still be delivered. 
+    # The lines go to standard error unless out is given. It runs in 
+    # O(U), where U is the number of unresolved parcels.
+    if out is None:
+        out = sys.stderr
+    for p in parcels:
+        out.write('%s: parcel %d held at the hub, unknown address: %s %s\n' \
+            % (path_to_file, p.id, p.address, p.zip))
@@ -35,6 +35,15 @@ class ParcelGroup:
             if parcel.linked:
                 self.linked = True
     
+    def remove_parcel(self, parcel):
+        # This method takes a parcel out of the group, e.g. when its 
+        # address has been corrected. The group keeps its destination 
+        # and priority, so that a truck that is already driving to it 
+        # isn't sent anywhere else. It runs in O(N).
+        if parcel in self.parcels:
+            self.parcels.remove(parcel)
+            self.linked = any(item.linked for item in self.parcels)
+
     # The methods after this point are self-evident getters 
     # and setters, or overridden operator functions.
     def get_destination(self):
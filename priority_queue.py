@@ -3,6 +3,8 @@
 
 """Module for creating Priority Queue data structure"""
 
+from functools import cmp_to_key
+
 class PriorityQueue:
     """Priority Queue"""
 
@@ -12,74 +14,173 @@ class PriorityQueue:
     # assumption that, if we deliver parcels in order of priority, 
     # we will deliver all parcels on-time.
 
+    # The queue is stored as a binary max-heap in a list. Each entry is
+    # an [item, sequence] pair, where the sequence number records the
+    # order in which items were pushed. Items are compared with their own
+    # comparison operators, and items with equal priority come out in
+    # the order they were pushed.
+
     def __init__(self):
         # init has a runtime of O(1)
         self.queue = []
-        
+
+        # position of each item in the heap, so that membership checks
+        # are O(1) and items can be found without searching the heap
+        self.positions = {}
+
+        # the number of parcels held by each item when it was pushed,
+        # the running total of those counts, and the IDs of the parcels
+        # currently in the queue
+        self.counts = {}
+        self.parcel_count = 0
+        self.parcel_ids = set()
+
+        self.sequence = 0
+
+    def comes_before(self, i, j):
+        # This method checks whether the entry at index i should be
+        # popped before the entry at index j. It runs in O(1).
+        item_i, seq_i = self.queue[i]
+        item_j, seq_j = self.queue[j]
+        if item_i > item_j:
+            return True
+        if item_j > item_i:
+            return False
+        return seq_i < seq_j
+
+    def swap(self, i, j):
+        # This method swaps two entries and updates their positions. It
+        # runs in O(1).
+        self.queue[i], self.queue[j] = self.queue[j], self.queue[i]
+        self.positions[self.queue[i][0]] = i
+        self.positions[self.queue[j][0]] = j
+
+    def sift_up(self, index):
+        # This method moves an entry up the heap until its parent comes
+        # before it. It runs in O(log N).
+        while index > 0:
+            parent = (index - 1) // 2
+            if self.comes_before(index, parent):
+                self.swap(index, parent)
+                index = parent
+            else:
+                break
+
+    def sift_down(self, index):
+        # This method moves an entry down the heap until it comes before
+        # both of its children. It runs in O(log N).
+        size = len(self.queue)
+        while True:
+            first = index
+            left = 2 * index + 1
+            right = left + 1
+            if left < size and self.comes_before(left, first):
+                first = left
+            if right < size and self.comes_before(right, first):
+                first = right
+            if first == index:
+                break
+            self.swap(index, first)
+            index = first
+
     def push(self, item):
         # This function has the main sorting algorithm that prioritizes 
         # the parcels and ensures that we are delivering them in the 
-        # right order. This algorithm is a version of insertion sort,
-        # which has a worst-case runtime of O(N^2).
-
-        if item not in self.queue:
-            # queue will stay sorted by having the push
-            # method put items in the "correct" place
-            added = False
-            index = 0
-            while not added and index < len(self.queue):
-                if item > self.queue[index]:
-                    self.queue.insert(index, item)
-                    added = True
-                else:
-                    index = index + 1
-            
-            if not added:
-                self.queue.append(item)
+        # right order. The item is added to the bottom of the heap and
+        # moved up into place, which has a worst-case runtime of O(log N).
+
+        if item not in self.positions:
+            self.queue.append([item, self.sequence])
+            self.sequence = self.sequence + 1
+            self.positions[item] = len(self.queue) - 1
+            self.sift_up(len(self.queue) - 1)
+
+            self.counts[item] = item.count()
+            self.parcel_count = self.parcel_count + self.counts[item]
+            for parcel in item.items():
+                self.parcel_ids.add(parcel.id)
+
+    def remove_at(self, index):
+        # This method removes the entry at the given index by moving the
+        # last entry into its place and restoring the heap. It runs in
+        # O(log N), plus the number of parcels in the removed item.
+        item = self.queue[index][0]
+        last = len(self.queue) - 1
+        if index != last:
+            self.swap(index, last)
+        self.queue.pop()
+        del self.positions[item]
+
+        if index < len(self.queue):
+            self.sift_down(index)
+            self.sift_up(index)
+
+        self.parcel_count = self.parcel_count - self.counts.pop(item)
+        for parcel in item.items():
+            self.parcel_ids.discard(parcel.id)
+        return item
 
     def remove(self, item):
-        # This method has a runtime of O(N) as it looks through the 
-        # list linearly to find the item.
-        if item in self.queue:
-            self.queue.remove(item)
-    
+        # This method has a runtime of O(log N), as the position index
+        # tells us where the item is in the heap.
+        if item in self.positions:
+            self.remove_at(self.positions[item])
+
+    def update_priority(self, item, value):
+        # This method changes the priority of an item that is already in
+        # the queue and moves it to its new place, in O(log N). Priorities
+        # should only be changed through this method while an item is in
+        # the queue.
+        item.set_priority(value)
+        if item in self.positions:
+            index = self.positions[item]
+            self.sift_up(index)
+            self.sift_down(self.positions[item])
+
     def pop(self):
-        # because the queue will always be sorted from largest to smallest,
-        # we can make the pop function always run in O(1) time since the
-        # largest value is always at index 0
+        # the item with the highest priority is always at the top of the
+        # heap, so pop runs in O(log N)
         if len(self.queue) > 0:
-            item = self.queue[0]
-            del self.queue[0]
-            return item
+            return self.remove_at(0)
 
     def peek(self):
         # this method has a runtime of O(1)
         if len(self.queue) > 0:
-            return self.queue[0]
+            return self.queue[0][0]
 
     def count(self):
-        # this method has a runtime of O(N) where N is the number of items in
-        # the data structure already
-        count = 0
-        for item in self.queue:
-            count = count + item.count()
-        return count
+        # this method has a runtime of O(1), as the number of parcels is
+        # kept up to date by push() and remove_at()
+        return self.parcel_count
 
     def contains(self, item):
-        # this method has a runtime of O(N) where N is the number of items in 
-        # the data structure already
-        for group in self.queue:
-            if item in group.items():
-                return True
-        return False
-    
-    def items(self):
         # this method has a runtime of O(1)
-        return self.queue
+        return item.id in self.parcel_ids
+
+    def __len__(self):
+        # this method has a runtime of O(1)
+        return len(self.queue)
+
+    def __contains__(self, item):
+        # this method has a runtime of O(1)
+        return item in self.positions
+
+    def items(self):
+        # this method has a runtime of O(N log N), as it returns the items
+        # in the order they will be popped
+        def compare(entry_a, entry_b):
+            if entry_a[0] > entry_b[0]:
+                return -1
+            if entry_b[0] > entry_a[0]:
+                return 1
+            return entry_a[1] - entry_b[1]
+
+        entries = sorted(self.queue, key=cmp_to_key(compare))
+        return [entry[0] for entry in entries]
 
     def print_all(self):
         # this method has a runtime of O(N) where N is the number of items in 
         # the data structure already
-        for group in self.queue:
+        for group in self.items():
             for item in group.items():
-                print(str(item))
\ No newline at end of file
+                print(str(item))
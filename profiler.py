@@ -0,0 +1,171 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Module for profiling the simulation
+The Profiler times each phase of the simulation and counts the table
+lookups, distance lookups and heap operations. It works by wrapping
+the methods it measures when it is installed and putting the original
+methods back when it is uninstalled, so nothing is measured, and
+nothing is slowed down, unless a profiler is installed.
+"""
+
+from __future__ import print_function
+
+import cProfile
+import functools
+import sys
+import time
+
+from clock import Clock
+from events import EventEngine
+from graph import Graph, Node
+from loader import Loader
+from priority_queue import PriorityQueue
+from savings import SavingsLoader
+from table import Table
+from truck import Truck
+
+
+# methods that are timed, as (class, method, phase name)
+TIMED = [
+    (Clock, 'tick', 'clock.tick'),
+    (EventEngine, 'advance_to', 'engine.advance_to'),
+    (EventEngine, 'receive_parcels', 'engine.receive_parcels'),
+    (Truck, 'update', 'truck.update'),
+    (Loader, 'run', 'loader.run'),
+    (Loader, 'build_parcel_list', 'loader.build_parcel_list'),
+    (Loader, 'plan_routes', 'loader.plan_routes'),
+    (Loader, 'reorder_parcels', 'loader.reorder_parcels'),
+    (Loader, 'improve_route', 'loader.improve_route'),
+    (SavingsLoader, 'run', 'savings.run'),
+    (SavingsLoader, 'build_groups', 'savings.build_groups'),
+    (SavingsLoader, 'build_routes', 'savings.build_routes'),
+    (Table, 'lookup', 'table.lookup'),
+]
+
+# methods that are only counted, as they are called too often to time
+COUNTED = [
+    (Table, 'items', 'table.scan'),
+    (Graph, 'distance', 'graph.distance'),
+    (Graph, 'distances_from', 'graph.distances_from'),
+    (Node, 'get_distance', 'node.get_distance'),
+    (PriorityQueue, 'push', 'heap.push'),
+    (PriorityQueue, 'pop', 'heap.pop'),
+    (PriorityQueue, 'remove', 'heap.remove'),
+    (PriorityQueue, 'update_priority', 'heap.update_priority'),
+]
+
+
+class PhaseTimer:
+    # Context manager that adds the time spent inside a with block to
+    # one of the profiler's phases
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.started = None
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.add_time(self.name, \
+            time.perf_counter() - self.started)
+        return False
+
+
+class Profiler:
+    # Each phase keeps the number of times it ran and the total time spent
+    # in it. Times include any other phases that run inside it, e.g.
+    # loader.run includes loader.reorder_parcels. Recording a time or a
+    # count runs in O(1).
+
+    # init runs in O(1)
+    def __init__(self):
+        self.calls = {}
+        self.times = {}
+        self.counts = {}
+
+        # (owner, attribute, original) for each wrapped method, so they
+        # can be put back by uninstall()
+        self.patched = []
+
+    def timer(self, name):
+        # returns a context manager that times a with block as the phase
+        return PhaseTimer(self, name)
+
+    def add_time(self, name, elapsed):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        self.times[name] = self.times.get(name, 0) + elapsed
+
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def wrap(self, owner, attribute, name, timed=True):
+        # This method replaces a method of the owner class with one that
+        # times or counts each call before calling the original
+        original = getattr(owner, attribute)
+        profiler = self
+
+        if timed:
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                with profiler.timer(name):
+                    return original(*args, **kwargs)
+        else:
+            @functools.wraps(original)
+            def wrapper(*args, **kwargs):
+                profiler.counts[name] = profiler.counts.get(name, 0) + 1
+                return original(*args, **kwargs)
+
+        setattr(owner, attribute, wrapper)
+        self.patched.append((owner, attribute, original))
+
+    def install(self):
+        # This method starts measuring the simulation, and runs in O(1)
+        for owner, attribute, name in TIMED:
+            self.wrap(owner, attribute, name)
+        for owner, attribute, name in COUNTED:
+            self.wrap(owner, attribute, name, timed=False)
+
+    def uninstall(self):
+        # This method puts the original methods back, in reverse order in
+        # case a method was wrapped more than once
+        while len(self.patched) > 0:
+            owner, attribute, original = self.patched.pop()
+            setattr(owner, attribute, original)
+
+    def __enter__(self):
+        self.install()
+        return self
+
+    def __exit__(self, *exc):
+        self.uninstall()
+        return False
+
+    def report(self, out=None):
+        # This method writes the phases, slowest first, followed by the
+        # counters. It runs in O(P log P), where P is the number of phases.
+        if out is None:
+            out = sys.stdout
+        out.write('%-28s %10s %12s %12s\n' \
+            % ('phase', 'calls', 'total (s)', 'mean (ms)'))
+        for name in sorted(self.times, key=self.times.get, reverse=True):
+            calls = self.calls[name]
+            out.write('%-28s %10d %12.4f %12.4f\n' % (name, calls, \
+                self.times[name], 1000 * self.times[name] / calls))
+
+        out.write('\n%-28s %10s\n' % ('counter', 'count'))
+        for name in sorted(self.counts):
+            out.write('%-28s %10d\n' % (name, self.counts[name]))
+
+
+def profile_call(path, function, *args, **kwargs):
+    # This function runs the function under cProfile, writes the stats
+    # to the given path for use with pstats or snakeviz, and returns
+    # whatever the function returned
+    stats = cProfile.Profile()
+    try:
+        return stats.runcall(function, *args, **kwargs)
+    finally:
+        stats.dump_stats(path)
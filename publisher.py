@@ -0,0 +1,84 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Module for sharing the state of the simulation between processes
+The simulation runs in a child process, while the parent process waits
+for the user. Instead of sending the whole parcel table to the parent
+on every tick, the child only sends the parcels whose status changed,
+and the parent applies those changes to its own copy of the table when
+the user asks to see it.
+"""
+
+from multiprocessing import Queue, RawValue
+
+
+class StateChannel:
+    """Channel from the simulation process to the parent process"""
+
+    # The clock time and mileage are kept in shared memory and simply
+    # overwritten on each tick. Parcel changes are sent through a queue
+    # as lists of (id, status, truck, delivery time) tuples, and only on
+    # ticks where something changed. The cost of publishing a tick therefore
+    # depends on the number of parcels that changed, not on the size
+    # of the manifest. Both sides should hold the simulation lock while
+    # using the channel, so that the parent never reads half a tick.
+
+    # init runs in O(1)
+    def __init__(self):
+        self.queue = Queue()
+        self.time = RawValue('i', 0)
+        self.total_miles = RawValue('d', 0)
+        self.miles_saved = RawValue('d', 0)
+
+        # the number of messages that have been sent by the child and
+        # received by the parent
+        self.sent = RawValue('i', 0)
+        self.received = 0
+
+        # the table being watched by the child, and the keys of the
+        # parcels that have changed since the last publish
+        self.table = None
+        self.changed = {}
+
+    def watch(self, table):
+        # This method is called by the child to start recording changes
+        # to the parcels in the table. It runs in O(1).
+        self.table = table
+        table.watch(self.record)
+
+    def record(self, key, attribute, old_value, new_value):
+        # Called by the table whenever a parcel changes, in O(1). The dict
+        # is used as an ordered set of keys.
+        if attribute == 'status':
+            self.changed[key] = None
+
+    def publish(self, time, total_miles, miles_saved):
+        # This method sends the state at the end of a tick. It runs in
+        # O(C), where C is the number of parcels that changed.
+        if len(self.changed) > 0:
+            changes = []
+            for key in self.changed:
+                parcel = self.table.get(key)
+                changes.append((key, parcel.status, parcel.truck_id, \
+                    parcel.delivery_time))
+            self.changed = {}
+            self.queue.put(changes)
+            self.sent.value = self.sent.value + 1
+
+        self.time.value = time
+        self.total_miles.value = total_miles
+        self.miles_saved.value = miles_saved
+
+    def receive(self, table):
+        # This method is called by the parent to bring its copy of the
+        # table up to date. It waits for every message the child has sent
+        # so far, then returns the current time and mileage. It runs in
+        # O(C), where C is the number of changes since the last call.
+        while self.received < self.sent.value:
+            for key, status, truck_id, delivery_time in self.queue.get():
+                parcel = table.get(key)
+                parcel.set_delivery_time(delivery_time)
+                parcel.set_status(status, truck_id)
+            self.received = self.received + 1
+
+        return self.time.value, self.total_miles.value, \
+            self.miles_saved.value
@@ -0,0 +1,227 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Module for improving truck routes
+The Loader builds each route with a greedy nearest-neighbour pass.
+The RouteOptimizer takes that route and shortens it with 2-opt
+and Or-opt moves, as long as no deadlines are broken.
+"""
+
+import math
+import time
+
+
+class RouteOptimizer:
+    # The RouteOptimizer improves the order in which a truck visits the
+    # groups in its load. Each candidate move is evaluated using only the
+    # distances that change (delta evaluation), so checking a move runs
+    # in O(1). Moves that shorten the route are only kept if every
+    # deadline parcel still arrives in time, which costs O(K), where K
+    # is the number of stops on the route.
+
+    # init runs in O(1)
+    def __init__(self, graph, max_moves=1000, time_limit=0.5):
+        self.graph = graph
+
+        # the optimizer stops after making max_moves improving moves or
+        # once time_limit seconds have passed, whichever comes first. A
+        # time_limit of None only uses the move budget, so the result
+        # doesn't depend on how busy the machine is.
+        self.max_moves = max_moves
+        self.time_limit = time_limit
+
+    def route_distance(self, hub, route):
+        # This method returns the length of the route in miles, starting
+        # and ending at the hub. It runs in O(K).
+        distance = self.graph.distance
+        total = 0
+        prev = hub.id
+        for group in route:
+            total = total + distance(prev, group.get_destination().id)
+            prev = group.get_destination().id
+        return total + distance(prev, hub.id)
+
+    def arrival_times(self, hub, route, speed):
+        # This method returns the time, in minutes after the start, at
+        # which the truck arrives at each stop. Each leg is rounded up to
+        # the whole minute, the same way Truck.calc_arrival_time() does.
+        # It runs in O(K).
+        distance = self.graph.distance
+        times = []
+        elapsed = 0
+        prev = hub.id
+        for group in route:
+            node_id = group.get_destination().id
+            if node_id != prev:
+                elapsed = elapsed + math.ceil(distance(prev, node_id) / speed)
+            times.append(elapsed)
+            prev = node_id
+        return times
+
+    def deadline(self, group, start_time):
+        # This method returns the latest arrival for a group, in minutes
+        # after the start, based on the earliest deadline of its parcels.
+        # Groups without deadlines return None. It runs in O(P), where P
+        # is the number of parcels in the group.
+        earliest = None
+        for parcel in group.items():
+            if parcel.delivery_deadline is not None:
+                if earliest is None or parcel.delivery_deadline < earliest:
+                    earliest = parcel.delivery_deadline
+        if earliest is None:
+            return None
+        return earliest - start_time
+
+    def get_limits(self, hub, route, start_time, speed):
+        # This method works out the latest time each deadline group may be
+        # reached. A group that makes its deadline on the original route
+        # must still make it, and a group that was already late may not
+        # be reached any later than it was. If the start time isn't known,
+        # deadline groups may not be reached any later than they were.
+        # It runs in O(N), where N is the number of parcels on the route.
+        times = self.arrival_times(hub, route, speed)
+        limits = {}
+        for group, arrival in zip(route, times):
+            if start_time is None:
+                latest = None
+                for parcel in group.items():
+                    if parcel.delivery_deadline is not None:
+                        latest = arrival
+            else:
+                latest = self.deadline(group, start_time)
+                if latest is not None and arrival > latest:
+                    latest = arrival
+            if latest is not None:
+                limits[group] = latest
+        return limits
+
+    def deadlines_met(self, hub, route, speed, limits):
+        # This method checks the route against the limits found by
+        # get_limits(). It runs in O(K).
+        if len(limits) == 0:
+            return True
+        times = self.arrival_times(hub, route, speed)
+        for group, arrival in zip(route, times):
+            if group in limits and arrival > limits[group]:
+                return False
+        return True
+
+    def cheapest_insertion(self, start, end, route, group, start_time, \
+                           speed, required=False):
+        # This method finds the cheapest place to add the group to a route
+        # that is already under way: the truck reaches start at start_time,
+        # visits each group in route and then drives to end. The extra
+        # miles for each position are found from the three distances that
+        # change, and positions are checked from the cheapest up until one
+        # keeps every deadline, as in get_limits(), with the new group held
+        # to its own deadline. Of two equally cheap positions, one next to
+        # a stop at the same place is tried first. It returns (position,
+        # extra miles), or (None, None) if no position keeps the deadlines,
+        # unless required is True, in which case the cheapest position is
+        # returned anyway.
+        # It runs in O(K^2) at worst, where K is the number of stops.
+        distance = self.graph.distance
+        ids = [start.id] + [g.get_destination().id for g in route] + [end.id]
+        node = group.get_destination().id
+        costs = []
+        for i in range(len(route) + 1):
+            extra = distance(ids[i], node) + distance(node, ids[i + 1]) \
+                - distance(ids[i], ids[i + 1])
+            apart = ids[i] != node and ids[i + 1] != node
+            costs.append((round(extra, 9), apart, i))
+        costs.sort()
+
+        limits = self.get_limits(start, route, start_time, speed)
+        if start_time is not None:
+            latest = self.deadline(group, start_time)
+            if latest is not None:
+                limits[group] = latest
+        for extra, apart, i in costs:
+            candidate = route[:i] + [group] + route[i:]
+            if self.deadlines_met(start, candidate, speed, limits):
+                return i, extra
+        if required:
+            return costs[0][2], costs[0][0]
+        return None, None
+
+    def two_opt(self, hub, route, speed, limits):
+        # This method tries reversing each section of the route, keeping
+        # the first reversal that shortens the route without breaking a
+        # deadline. It returns True if the route was changed.
+        distance = self.graph.distance
+        ids = [hub.id] + [g.get_destination().id for g in route] + [hub.id]
+        for i in range(1, len(ids) - 2):
+            for j in range(i + 1, len(ids) - 1):
+                delta = distance(ids[i - 1], ids[j]) \
+                    + distance(ids[i], ids[j + 1]) \
+                    - distance(ids[i - 1], ids[i]) \
+                    - distance(ids[j], ids[j + 1])
+                if delta < -1e-9:
+                    candidate = route[:i - 1] + route[i - 1:j][::-1] \
+                        + route[j:]
+                    if self.deadlines_met(hub, candidate, speed, limits):
+                        route[:] = candidate
+                        return True
+        return False
+
+    def or_opt(self, hub, route, speed, limits):
+        # This method tries moving each section of one to three stops to
+        # every other place in the route, keeping the first move that
+        # shortens the route without breaking a deadline. It returns True
+        # if the route was changed.
+        distance = self.graph.distance
+        ids = [hub.id] + [g.get_destination().id for g in route] + [hub.id]
+        stops = len(route)
+        for length in range(1, 4):
+            for i in range(1, stops - length + 2):
+                end = i + length - 1
+                removed = distance(ids[i - 1], ids[end + 1]) \
+                    - distance(ids[i - 1], ids[i]) \
+                    - distance(ids[end], ids[end + 1])
+                for p in range(0, stops + 1):
+                    if i - 1 <= p <= end:
+                        continue
+                    delta = removed + distance(ids[p], ids[i]) \
+                        + distance(ids[end], ids[p + 1]) \
+                        - distance(ids[p], ids[p + 1])
+                    if delta < -1e-9:
+                        # route positions are one less than ids positions
+                        segment = route[i - 1:end]
+                        rest = route[:i - 1] + route[end:]
+                        if p < i:
+                            at = p
+                        else:
+                            at = p - length
+                        candidate = rest[:at] + segment + rest[at:]
+                        if self.deadlines_met(hub, candidate, speed, \
+                                limits):
+                            route[:] = candidate
+                            return True
+        return False
+
+    def improve(self, hub, load, start_time=None, speed=0.4):
+        # This method improves the route given by the load, which should
+        # be in the order that the truck will visit each group. It returns
+        # the improved load and the number of miles saved. Finding each
+        # move takes O(K^2) for both 2-opt and Or-opt, plus O(K) for each
+        # candidate that is checked against the deadlines.
+        route = list(load)
+        if len(route) < 2:
+            return route, 0
+
+        started = time.perf_counter()
+        before = self.route_distance(hub, route)
+        limits = self.get_limits(hub, route, start_time, speed)
+
+        moves = 0
+        while moves < self.max_moves:
+            if self.time_limit is not None and \
+                    time.perf_counter() - started > self.time_limit:
+                break
+            improved = self.two_opt(hub, route, speed, limits)
+            if not improved:
+                improved = self.or_opt(hub, route, speed, limits)
+            if not improved:
+                break
+            moves = moves + 1
+
+        return route, before - self.route_distance(hub, route)
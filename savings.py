@@ -0,0 +1,258 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Module for the savings planner
+The SavingsLoader is a drop-in replacement for the Loader that plans
+the routes and the truck loads together, using the Clarke-Wright
+savings algorithm, instead of filling each truck by priority first
+and routing it afterwards.
+"""
+
+import math
+
+from loader import Loader
+from parcel_group import ParcelGroup
+
+
+class SavingsLoader(Loader):
+    # Every group of parcels at the hub starts out on a route of its own.
+    # Joining the routes ending at a and starting at b saves
+    #     d(hub, a) + d(hub, b) - d(a, b)
+    # miles, so pairs are joined in order of their savings, as long as
+    # the joined route fits on a truck and every deadline that could be
+    # met before is still met. Only the closest neighbours of each group
+    # are considered, which keeps the number of pairs at O(G * K) instead
+    # of O(G^2), where G is the number of groups. The routes with the
+    # earliest deadlines are then handed to the trucks that are at the
+    # hub, and the rest wait for the next truck to come back.
+
+    # init runs in O(1)
+    def __init__(self, parcel_table, graph, workers=None, neighbours=25):
+        Loader.__init__(self, parcel_table, graph, workers)
+
+        # number of closest groups that each group may be joined with
+        self.neighbours = neighbours
+
+    def build_groups(self, capacity):
+        # This method groups every parcel at the hub by destination. A
+        # destination with more parcels than a truck can carry is split
+        # into several groups, highest priority first. The parcels in each
+        # cluster of linked parcels get groups of their own, and are left
+        # at the hub until the whole cluster has arrived. Other parcels
+        # going to the same place as a cluster join its group if there is
+        # room for them on the cluster's route. It runs in O(N log N),
+        # where N is the number of parcels at the hub.
+        places = []
+        sizes = {}  # number of parcels on each cluster's route
+        for destination, parcels in self.destinations.items():
+            if destination is None:
+                continue
+            at_hub = [p for p in parcels if self.is_ready(p) \
+                      and self.cluster_ready(p)]
+            at_hub.sort(key=lambda p: p.priority, reverse=True)
+
+            unlinked = []
+            clusters = {}
+            for parcel in at_hub:
+                if parcel.id in self.clusters:
+                    key = id(self.clusters[parcel.id])
+                    if key not in clusters:
+                        clusters[key] = []
+                    clusters[key].append(parcel)
+                    sizes[key] = sizes.get(key, 0) + 1
+                else:
+                    unlinked.append(parcel)
+            places.append((unlinked, clusters))
+
+        groups = []
+        for unlinked, clusters in places:
+            for key, items in clusters.items():
+                if len(unlinked) > 0 \
+                        and sizes[key] + len(unlinked) <= capacity:
+                    sizes[key] = sizes[key] + len(unlinked)
+                    items.extend(unlinked)
+                    unlinked = []
+
+            for items in [unlinked] + list(clusters.values()):
+                for i in range(0, len(items), capacity):
+                    group = ParcelGroup()
+                    for parcel in items[i:i + capacity]:
+                        group.add_parcel(parcel)
+                    groups.append(group)
+        return groups
+
+    def get_latest(self, hub, groups, start_time, speed):
+        # This method works out the latest time each group may be reached,
+        # in minutes after the start. Groups that would miss their deadline
+        # even on a trip of their own may arrive as late as that trip
+        # would. It runs in O(N), where N is the number of parcels.
+        latest = {}
+        for group in groups:
+            limit = self.timetable.deadline(group, start_time)
+            if limit is not None:
+                alone = self.timetable.arrival_times(hub, [group], speed)[0]
+                latest[group] = max(limit, alone)
+        return latest
+
+    def get_savings(self, hub, groups):
+        # This method returns the (saving, i, j) tuples for each group and
+        # its closest neighbours, largest saving first. It runs in
+        # O(G^2 + G * K log(G * K)), as every distance is read once.
+        distance = self.graph.distance
+        ids = [group.get_destination().id for group in groups]
+        from_hub = [distance(hub.id, id_) for id_ in ids]
+
+        pairs = {}
+        for i, id_i in enumerate(ids):
+            row = self.graph.distances_from(id_i, ids)
+            closest = sorted(range(len(ids)), key=row.__getitem__)
+            for j in closest[:self.neighbours + 1]:
+                if i != j:
+                    key = (min(i, j), max(i, j))
+                    pairs[key] = from_hub[i] + from_hub[j] - row[j]
+
+        savings = [(saving, i, j) for (i, j), saving in pairs.items()]
+        savings.sort(key=lambda s: (-s[0], s[1], s[2]))
+        return savings
+
+    def get_clusters(self, groups):
+        # This method returns the lists of groups that hold parcels from
+        # the same cluster, for clusters that are spread over more than
+        # one group. Each of those groups holds a single cluster, as made
+        # by build_groups(). It runs in O(G).
+        clusters = {}
+        for group in groups:
+            parcel = group.items()[0]
+            if parcel.id in self.clusters:
+                key = id(self.clusters[parcel.id])
+                if key not in clusters:
+                    clusters[key] = []
+                clusters[key].append(group)
+        return [route for route in clusters.values() if len(route) > 1]
+
+    def join(self, route_a, route_b, a, b):
+        # This method returns route_a and route_b joined so that group a
+        # is next to group b, or None if either of them is in the middle
+        # of its route. It runs in O(K).
+        if route_a[-1] is a and route_b[0] is b:
+            return route_a + route_b
+        if route_a[0] is a and route_b[-1] is b:
+            return route_b + route_a
+        if route_a[-1] is a and route_b[-1] is b:
+            return route_a + route_b[::-1]
+        if route_a[0] is a and route_b[0] is b:
+            return route_a[::-1] + route_b
+        return None
+
+    def fits(self, hub, route, speed, latest):
+        # This method checks that every group on the route is reached in
+        # time, in O(K)
+        if len(latest) == 0:
+            return True
+        times = self.timetable.arrival_times(hub, route, speed)
+        for group, arrival in zip(route, times):
+            if group in latest and arrival > latest[group]:
+                return False
+        return True
+
+    def build_routes(self, hub, groups, capacity, start_time, speed):
+        # This method runs the savings algorithm and returns the routes.
+        # Linked parcels have to travel together, so the groups holding
+        # each cluster start out on a route of their own if they fit on a
+        # truck. Checking each join runs in O(K), so the whole method runs
+        # in O(S * K), plus the time taken to find the savings, where S is
+        # the number of pairs that are considered.
+        latest = {}
+        if start_time is not None:
+            latest = self.get_latest(hub, groups, start_time, speed)
+
+        route_of = {}
+        counts = {}
+
+        for route in self.get_clusters(groups):
+            count = sum(group.count() for group in route)
+            if count <= capacity:
+                for group in route:
+                    route_of[group] = route
+                counts[id(route)] = count
+
+        for group in groups:
+            if group not in route_of:
+                route = [group]
+                route_of[group] = route
+                counts[id(route)] = group.count()
+
+        for saving, i, j in self.get_savings(hub, groups):
+            if saving <= 0:
+                break
+            a = groups[i]
+            b = groups[j]
+            route_a = route_of[a]
+            route_b = route_of[b]
+            if route_a is route_b:
+                continue
+            count = counts[id(route_a)] + counts[id(route_b)]
+            if count > capacity:
+                continue
+
+            joined = self.join(route_a, route_b, a, b)
+            if joined is None or not self.fits(hub, joined, speed, latest):
+                continue
+
+            del counts[id(route_a)]
+            del counts[id(route_b)]
+            for group in joined:
+                route_of[group] = joined
+            counts[id(joined)] = count
+
+        routes = []
+        seen = set()
+        for group in groups:
+            route = route_of[group]
+            if id(route) not in seen:
+                seen.add(id(route))
+                routes.append(route)
+        return routes
+
+    def earliest_deadline(self, route):
+        # returns the earliest deadline on the route, or infinity if none
+        # of its parcels has a deadline, in O(N)
+        earliest = math.inf
+        for group in route:
+            for parcel in group.items():
+                if parcel.delivery_deadline is not None:
+                    earliest = min(earliest, parcel.delivery_deadline)
+        return earliest
+
+    def run(self, trucks, current_time=None):
+        # This method plans routes for every parcel at the hub, then gives
+        # the most urgent routes, and the fullest ones after that, to the
+        # trucks. The routes are improved through plan_routes(), so they
+        # are shared out between the workers when there are any. Like
+        # Loader.run(), it returns 1 if there is nothing left to load, and
+        # 0 otherwise.
+        if len(trucks) == 0:
+            raise ValueError('there are no trucks to load')
+
+        capacity = min(truck.get_max_capacity() for truck in trucks)
+        groups = self.build_groups(capacity)
+        if len(groups) == 0:
+            return 1
+
+        hub = trucks[0].hub_node
+        if hub is None:
+            hub = self.graph.get_node(1)
+        routes = self.build_routes(hub, groups, capacity, current_time, \
+            trucks[0].speed)
+        routes.sort(key=lambda route: (self.earliest_deadline(route), \
+            -sum(group.count() for group in route)))
+
+        trucks = trucks[:len(routes)]
+        routes = routes[:len(trucks)]
+        for route in routes:
+            for i, group in enumerate(route):
+                group.set_priority(len(route) - i)
+        routes = self.plan_routes(trucks, routes, current_time, False)
+        for truck, route in zip(trucks, routes):
+            self.send_to_truck(truck, route)
+
+        return 0
@@ -0,0 +1,313 @@
+# C950 - Anthony Utt - autt3 - ID#000854797
+
+"""Monte Carlo scenarios for the delivery simulation
+Runs the day many times over with random changes to the manifest or
+the fleet, and reports how the on-time rate, the number of late
+parcels and the total mileage are spread across the runs. Each
+scenario is given as a list of settings, e.g.
+    python scenarios.py --runs 200 --workers 4 \
+        --scenario "name=third driver,trucks=3" \
+        --scenario "name=delays,delay=0.1,delay_until=10:30 AM"
+Every scenario is run with the same seeds, so the differences between
+them come from the settings and not from the luck of the draw.
+Corrections given with --correct, such as parcel 9's in the shipped
+manifest, are made in every run.
+"""
+
+from __future__ import print_function
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import copy
+import json
+import random
+import statistics
+
+from batch import PLANNERS, start_day, parse_corrections, \
+    check_corrections, CorrectionError
+from clock import Clock, parse_time
+from events import EventEngine
+from table import Table
+from truck import build_fleet
+import graph
+import parcel
+from parcel import Status
+
+
+# the results kept for each run, and reported for each scenario. finish
+# is the time the last truck got back, in minutes since midnight.
+METRICS = ['on_time_rate', 'late', 'undelivered', 'miles', 'finish']
+
+
+class Scenario:
+    """Scenario class
+    Holds the changes made to the base manifest and fleet for one
+    scenario.
+    """
+
+    # delay is the share of parcels that are held back until
+    # delay_until, and wrong_address is the share of parcels that are
+    # given a wrong address, picked at random from the addresses in the
+    # city. Their right address is only known at correction_time, so
+    # they can't leave the hub before then. Parcels that were already
+    # delayed in the manifest keep their original delay if it is later.
+    # speed is in miles per hour, and None leaves the trucks at their
+    # usual speed.
+
+    # init runs in O(1)
+    def __init__(self, name='base', trucks=2, speed=None, delay=0.0, \
+                 delay_until=parse_time('10:30 AM'), wrong_address=0.0, \
+                 correction_time=parse_time('10:20 AM'), planner='greedy'):
+        self.name = name
+        self.trucks = trucks
+        self.speed = speed
+        self.delay = delay
+        self.delay_until = delay_until
+        self.wrong_address = wrong_address
+        self.correction_time = correction_time
+        self.planner = planner
+
+    @classmethod
+    def from_spec(cls, spec):
+        # This method creates a scenario from a string of comma-separated
+        # key=value settings, such as 'name=busy,delay=0.1,trucks=3'.
+        # Times are written like '10:30 AM'. It raises a ValueError for
+        # unknown settings, and runs in O(L), where L is the length of
+        # the string.
+        scenario = cls(name=spec)
+        for setting in spec.split(','):
+            if '=' not in setting:
+                raise ValueError('expected key=value, found ' + setting)
+            key, value = [part.strip() for part in setting.split('=', 1)]
+            if key == 'name' or key == 'planner':
+                setattr(scenario, key, value)
+            elif key == 'trucks':
+                scenario.trucks = int(value)
+                if scenario.trucks < 1:
+                    raise ValueError('trucks must be at least 1')
+            elif key in ('speed', 'delay', 'wrong_address'):
+                setattr(scenario, key, float(value))
+            elif key in ('delay_until', 'correction_time'):
+                setattr(scenario, key, parse_time(value))
+            else:
+                raise ValueError('unknown setting ' + key)
+        if scenario.planner not in PLANNERS:
+            raise ValueError('unknown planner ' + scenario.planner)
+        return scenario
+
+    def to_dict(self):
+        return dict(vars(self))
+
+
+# the graph, base manifest and address corrections used by the worker
+# processes, set by start_worker() so that they are only sent to each
+# worker once
+base_graph = None
+base_parcels = None
+base_corrections = []
+
+
+def start_worker(my_graph, parcels, corrections=()):
+    # This function runs once in each worker process
+    global base_graph, base_parcels, base_corrections
+    base_graph = my_graph
+    base_parcels = parcels
+    base_corrections = list(corrections)
+
+
+def perturb(parcels, scenario, rng, my_graph):
+    # This function applies the scenario's random delays and wrong
+    # addresses to the parcels, and returns the corrections that put
+    # the right addresses back, in O(N). Parcels whose address was
+    # already wrong in the manifest are left as they are.
+    addresses = [node for node in my_graph.list_nodes() if node.id != 1]
+    corrections = []
+    for p in parcels:
+        if rng.random() < scenario.delay:
+            p.delayed = True
+            p.arrival_time = max(p.arrival_time or 0, scenario.delay_until)
+        if rng.random() < scenario.wrong_address and len(addresses) > 0 \
+                and not p.wrong_address:
+            node = rng.choice(addresses)
+            corrections.append((p.id, scenario.correction_time, p.address, \
+                p.zip))
+            p.address = node.address
+            p.zip = node.zip
+            p.wrong_address = True
+    return corrections
+
+
+def simulate(scenario, seed):
+    # This function runs one day of the scenario in a worker process,
+    # using fresh copies of the base parcels, and returns its results.
+    # The graph is only read, so it is shared by every run in the worker.
+    rng = random.Random(seed)
+    parcels = [copy.copy(p) for p in base_parcels]
+    corrections = base_corrections + perturb(parcels, scenario, rng, \
+        base_graph)
+
+    my_table = Table(indexes=('status', 'delivery_node', \
+                              'delivery_deadline', 'zip'))
+    my_table.insert_many([(p.id, p) for p in parcels])
+
+    trucks = build_fleet(scenario.trucks, base_graph.get_node(1))
+    if scenario.speed is not None:
+        for truck in trucks:
+            truck.speed = scenario.speed / 60  # miles per minute
+    my_loader = PLANNERS[scenario.planner](my_table, base_graph)
+
+    clock = Clock()
+    clock.start()
+    try:
+        start_day(base_graph, my_table, my_loader, trucks, \
+            clock.current_time)
+        engine = EventEngine(clock, trucks, my_loader, my_table)
+        engine.start()
+        for parcel_id, time, address, zip_ in corrections:
+            engine.correct_address(time, parcel_id, address, zip_)
+        engine.run()
+    finally:
+        my_loader.close()
+
+    on_time = len(my_table.lookup(status=Status.DELIVERED))
+    late = len(my_table.lookup(status=Status.DELIVERED_LATE))
+    return {
+        'seed': seed,
+        'on_time_rate': on_time / max(len(parcels), 1),
+        'late': late,
+        'undelivered': len(parcels) - on_time - late,
+        'miles': sum(truck.get_total_miles() for truck in trucks),
+        'finish': clock.current_time,
+    }
+
+
+def run_scenarios(scenarios, my_graph, parcels, runs, seed=0, workers=None, \
+                  corrections=()):
+    # This function runs every scenario runs times, with the seeds seed
+    # to seed + runs - 1, and returns the results of each run by
+    # scenario name. corrections are the (parcel ID, time, address, zip)
+    # corrections made in every run. With more than one worker, the runs
+    # are spread over that many processes, each of which is given the
+    # graph, the base manifest and the corrections once when it starts.
+    # The results don't depend on the number of workers.
+    jobs = [(scenario, seed + i) for scenario in scenarios \
+            for i in range(runs)]
+
+    if workers is None or workers < 2:
+        start_worker(my_graph, parcels, corrections)
+        outcomes = [simulate(scenario, s) for scenario, s in jobs]
+    else:
+        with ProcessPoolExecutor(workers, initializer=start_worker, \
+                initargs=(my_graph, parcels, corrections)) as pool:
+            outcomes = list(pool.map(simulate, \
+                [scenario for scenario, s in jobs], \
+                [s for scenario, s in jobs], \
+                chunksize=max(1, len(jobs) // (workers * 4))))
+
+    results = {}
+    for (scenario, s), outcome in zip(jobs, outcomes):
+        results.setdefault(scenario.name, []).append(outcome)
+    return results
+
+
+def summarize(outcomes):
+    # This function returns the mean, standard deviation and the 5th,
+    # 50th and 95th percentiles of each metric, in O(R log R), where R
+    # is the number of runs
+    summary = {}
+    for metric in METRICS:
+        values = sorted(outcome[metric] for outcome in outcomes)
+        summary[metric] = {
+            'mean': statistics.fmean(values),
+            'stdev': statistics.pstdev(values),
+            'p5': percentile(values, 5),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+        }
+    return summary
+
+
+def percentile(values, percent):
+    # returns the given percentile of a sorted list, using the nearest
+    # rank, in O(1)
+    index = max(0, int(round(percent / 100 * len(values))) - 1)
+    return values[min(index, len(values) - 1)]
+
+
+def print_summary(name, summary, out=None):
+    print('\n' + name, file=out)
+    print('%-14s %10s %10s %10s %10s %10s' % ('metric', 'mean', 'stdev', \
+        'p5', 'p50', 'p95'), file=out)
+    for metric in METRICS:
+        values = summary[metric]
+        print('%-14s %10.3f %10.3f %10.3f %10.3f %10.3f' % (metric, \
+            values['mean'], values['stdev'], values['p5'], values['p50'], \
+            values['p95']), file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the day many times '
+        'with random changes and report the spread of the results.')
+    parser.add_argument('--nodes', default='node_list.csv')
+    parser.add_argument('--distances', default='distance_list.csv')
+    parser.add_argument('--parcels', default='parcel_list.csv')
+    parser.add_argument('--scenario', action='append', help='comma-'
+        'separated settings for a scenario: name, trucks, speed (mph), '
+        'delay, delay_until, wrong_address, correction_time and planner. '
+        'May be given more than once.')
+    parser.add_argument('--runs', type=int, default=100, help='number of '
+        'runs for each scenario')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, help='number of processes '
+        'to spread the runs over')
+    parser.add_argument('--json', help='file to save the results to')
+    parser.add_argument('--correct', nargs=4, action='append', \
+        metavar=('ID', 'TIME', 'ADDRESS', 'ZIP'), help='correct the '
+        'address of a parcel at the given time in every run, e.g. 9 '
+        '"10:20 AM" "410 S State St" 84111. May be given more than once.')
+    args = parser.parse_args(argv)
+
+    specs = args.scenario or ['name=base']
+    try:
+        scenarios = [Scenario.from_spec(spec) for spec in specs]
+    except ValueError as error:
+        parser.error(str(error))
+    names = [scenario.name for scenario in scenarios]
+    if len(set(names)) < len(names):
+        parser.error('each scenario needs a different name')
+    try:
+        corrections = parse_corrections(args.correct or [])
+    except ValueError as error:
+        parser.error(str(error))
+
+    # the graph and manifest are only read from disk once
+    my_graph = graph.Graph()
+    graph.load(args.nodes, args.distances, my_graph)
+    errors = []
+    parcels = list(parcel.read_parcels(args.parcels, errors))
+    parcel.report_errors(args.parcels, errors)
+    parcel.report_unresolved(args.parcels, my_graph.resolve_nodes(parcels))
+    try:
+        check_corrections(my_graph, corrections, \
+            set(p.id for p in parcels))
+    except CorrectionError as error:
+        parser.error(str(error))
+
+    results = run_scenarios(scenarios, my_graph, parcels, args.runs, \
+                            args.seed, args.workers, corrections)
+
+    summaries = {}
+    for scenario in scenarios:
+        summaries[scenario.name] = summarize(results[scenario.name])
+        print_summary(scenario.name, summaries[scenario.name])
+
+    if args.json is not None:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'runs': args.runs, 'seed': args.seed, \
+                       'scenarios': [s.to_dict() for s in scenarios], \
+                       'summaries': summaries, 'results': results}, \
+                      f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
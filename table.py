@@ -1,38 +1,174 @@
 # C950 - Anthony Utt - autt3 - ID#000854797
 
 class Table:
-    # init method with default value for table size
-    def __init__(self, table_size=10):
-        self.table = []
-
+    # init method with default value for table size. If the number of 
+    # items is known ahead of time, expected_size can be used to create 
+    # enough buckets up front so that the table never has to resize. 
+    # indexes is an optional list of item attributes to keep secondary 
+    # indexes on, so that lookup() doesn't have to scan the whole table.
+    def __init__(self, table_size=10, load_factor=0.75, expected_size=None, \
+                indexes=None):
         # While this is technically a two-dimensional list, it serves
         # its purpose as a table here. The hash() built-in method
         # will ensure that we are as efficient as possible. The largest
         # time commitment is going to be finding the item in the bucket
         # after the hash() function runs. It will have O(N) runtime,
-        # where N is the number of items in the bucket. For a faster 
-        # runtime at the expense of greater memory requirements, you
-        # could increase the number of buckets with the table_size 
-        # parameter.
-        for i in range(table_size):
-            self.table.append([])
+        # where N is the number of items in the bucket. To keep the 
+        # buckets small, the table doubles its number of buckets 
+        # whenever the number of items per bucket goes over the 
+        # load_factor, so a bucket holds O(1) items on average. To save 
+        # memory on large tables, a bucket is only created once something 
+        # is put in it (empty buckets are None), and each bucket holds its 
+        # keys and items side by side in one flat list, 
+        # [key1, item1, key2, item2, ...], rather than a tuple per item.
+        self.load_factor = load_factor
+        self.size = 0
+
+        if expected_size is not None:
+            table_size = max(table_size, \
+                int(expected_size / load_factor) + 1)
+
+        self.table = [None] * table_size
+
+        # Each secondary index maps an attribute value to the items that 
+        # currently have that value, keyed by their table key. The inner 
+        # dictionaries keep the order in which items were indexed.
+        self.indexes = {}
+        if indexes is not None:
+            for attribute in indexes:
+                self.indexes[attribute] = {}
+
+        # functions to call whenever an item reports a change, added 
+        # through watch()
+        self.watchers = []
+
+    def __len__(self):
+        # this method has a runtime of O(1)
+        return self.size
+
+    def __contains__(self, key):
+        # this method has the same runtime as get(), O(1) on average
+        bucket = self.table[hash(key) % len(self.table)]
+        return self.find(bucket, key) is not None
+
+    def find(self, bucket, key):
+        # This method returns the position of the key in the bucket, or 
+        # None if it isn't there. It runs in O(N), where N is the number 
+        # of items in the bucket.
+        if bucket is not None:
+            for i in range(0, len(bucket), 2):
+                if key == bucket[i]:
+                    return i
+        return None
+
+    def resize(self, table_size):
+        # This method moves every item into a new set of buckets. It has 
+        # a runtime of O(N), but because the table doubles in size each 
+        # time, the cost averages out to O(1) per insert.
+        old_table = self.table
+        self.table = [None] * table_size
+
+        for bucket in old_table:
+            if bucket is None:
+                continue
+            for i in range(0, len(bucket), 2):
+                bucket_index = hash(bucket[i]) % table_size
+                if self.table[bucket_index] is None:
+                    self.table[bucket_index] = []
+                self.table[bucket_index].extend(bucket[i:i + 2])
+
+    def reserve(self, count):
+        # This method makes sure the table has enough buckets to hold 
+        # count items without going over the load factor, so that a 
+        # batch of inserts only resizes the table once. It runs in O(N) 
+        # if the table needs to grow, and O(1) otherwise.
+        needed = int(count / self.load_factor) + 1
+        if needed > len(self.table):
+            table_size = len(self.table)
+            while table_size < needed:
+                table_size = table_size * 2
+            self.resize(table_size)
+
+    def insert_many(self, pairs):
+        # This method inserts a list of (key, item) pairs, making room 
+        # for all of them up front. It runs in O(K) on average, where K 
+        # is the number of pairs.
+        self.reserve(self.size + len(pairs))
+        for key, item in pairs:
+            self.insert(key, item)
+
+    def add_to_indexes(self, key, item):
+        # This method runs in O(I), where I is the number of indexes. Items 
+        # that have a 'table' attribute (such as parcels) are told which 
+        # table holds them, so they can report changes to indexed values.
+        for attribute, index in self.indexes.items():
+            value = getattr(item, attribute)
+            if value not in index:
+                index[value] = {}
+            index[value][key] = item
+        if len(self.indexes) > 0 and hasattr(item, 'table'):
+            item.table = self
+
+    def remove_from_indexes(self, key, item):
+        # This method runs in O(I), where I is the number of indexes
+        for attribute, index in self.indexes.items():
+            self.remove_from_index(index, getattr(item, attribute), key)
+
+    def remove_from_index(self, index, value, key):
+        # This method runs in O(1). Empty groups are dropped so that they 
+        # don't need to be checked by lookup().
+        group = index.get(value)
+        if group is not None and key in group:
+            del group[key]
+            if len(group) == 0:
+                del index[value]
+
+    def watch(self, watcher):
+        # This method adds a function to be called with the key, attribute, 
+        # old value and new value whenever an item reports a change 
+        # through update_index(). It runs in O(1).
+        self.watchers.append(watcher)
+
+    def update_index(self, key, attribute, old_value, new_value):
+        # Items call this method when one of their attributes is about to 
+        # change, so that the index for that attribute stays in sync. It 
+        # runs in O(1), plus the time taken by any watchers.
+        if old_value == new_value:
+            return
+        for watcher in self.watchers:
+            watcher(key, attribute, old_value, new_value)
+
+        index = self.indexes.get(attribute)
+        if index is None:
+            return
+        item = self.get(key)
+        if item is None:
+            return
+        self.remove_from_index(index, old_value, key)
+        if new_value not in index:
+            index[new_value] = {}
+        index[new_value][key] = item
 
     def insert(self, key, item):
         # Assuming that the key doesn't exist until we find a match. We
         # want to update the entry if the key exists, otherwise we add
         # a new entry to the table.
-        key_exists = False
         bucket_index = hash(key) % len(self.table)
         bucket = self.table[bucket_index]
-        for i, kv in enumerate(bucket):
-            k, v = kv
-            if key == k:
-                key_exists = True
-                break
-        if key_exists:
-            bucket[i] = ((key, item))
+        i = self.find(bucket, key)
+        if i is not None:
+            self.remove_from_indexes(key, bucket[i + 1])
+            bucket[i + 1] = item
         else:
-            bucket.append((key, item))
+            if bucket is None:
+                bucket = []
+                self.table[bucket_index] = bucket
+            bucket.append(key)
+            bucket.append(item)
+            self.size = self.size + 1
+            if self.size > len(self.table) * self.load_factor:
+                self.resize(len(self.table) * 2)
+        self.add_to_indexes(key, item)
 
     def get(self, key):
         # Here, we hash the key and then perform a linear search on the
@@ -42,10 +178,9 @@ class Table:
         # overall runtime of the application by a negligible amount.
         bucket_index = hash(key) % len(self.table)
         bucket = self.table[bucket_index]
-        for i, kv in enumerate(bucket):
-            k, v = kv
-            if key == k:
-                return v
+        i = self.find(bucket, key)
+        if i is not None:
+            return bucket[i + 1]
 
     def lookup(self, id_=None, address=None, city=None, state=None, \
                 zip_=None, mass=None, delivery_node=None, status=None, \
@@ -55,8 +190,13 @@ class Table:
             # a table in a database. Any of the inputs to the method can be 
             # used, but none of them are required. The function returns a 
             # list of items that meet all of the criteria given by the inputs.
-            # This method loops through every item in the table, so it has a
-            # worst-case runtime complexity of O(N).
+            # If none of the criteria have a secondary index, this method 
+            # loops through every item in the table, so it has a worst-case 
+            # runtime complexity of O(N). Otherwise, it only checks the items 
+            # found through the most selective index, so the runtime is 
+            # O(K), where K is the number of items in that index group. 
+            # status can be a single status code or a list of codes, any 
+            # of which will match.
             items_to_return = []
             
             # checking inputs
@@ -70,76 +210,115 @@ class Table:
             status_required = status is not None
             deadline_required = deadline is not None
 
-            for bucket in self.table:  # looping through table contents
-                for kv in bucket:
-                    k, item = kv
-                    include = True
-
-                    # checking attributes based on inputs. We use 'and' 
-                    # for all of these checks because we only want to 
-                    # return items that meet ALL of the input criteria
-                    if id_required:
-                        if type(id_) is int:
-                            include = include and item.id == id_
-                        elif type(id_) is str:
-                            split = id_.split(',')
-                            for word in split:
-                                include = include and item.id == int(word)
-                        else:
-                            pass
-                    if address_required:
-                        include = include and item.address == address
-                    if city_required:
-                        include = include and item.city == city
-                    if state_required:
-                        include = include and item.state == state
-                    if zip_required:
-                        include = include and item.zip == zip_
-                    if mass_required:
-                        include = include and item.mass == mass
-                    if node_required:
-                        include = include and item.delivery_node \
-                            is delivery_node
-                    if status_required:
-                        split = status.split(',')
+            if status_required:
+                if isinstance(status, (list, tuple, set, frozenset)):
+                    statuses = tuple(status)
+                else:
+                    statuses = (status,)
+
+            # narrowing down the items to check using the indexes
+            candidates = None
+            for attribute, value in (('status', status), \
+                    ('delivery_node', delivery_node), \
+                    ('delivery_deadline', deadline), ('zip', zip_)):
+                if value is None or attribute not in self.indexes:
+                    continue
+                if attribute == 'status':
+                    groups = self.status_groups(statuses)
+                elif attribute == 'delivery_deadline':
+                    groups = self.deadline_groups(deadline)
+                else:
+                    groups = [self.indexes[attribute].get(value, {})]
+
+                count = 0
+                for group in groups:
+                    count = count + len(group)
+                if candidates is None or count < len(candidates):
+                    candidates = []
+                    for group in groups:
+                        candidates.extend(group.values())
+
+            if candidates is None:
+                candidates = self.items()
+
+            for item in candidates:  # looping through table contents
+                include = True
+
+                # checking attributes based on inputs. We use 'and' 
+                # for all of these checks because we only want to 
+                # return items that meet ALL of the input criteria
+                if id_required:
+                    if type(id_) is int:
+                        include = include and item.id == id_
+                    elif type(id_) is str:
+                        split = id_.split(',')
                         for word in split:
-                            if word[0:1] == '-':
-                                include = include and word[1:] not in \
-                                    item.status
-                            else:
-                                include = include and word in item.status
-                    
-                    if deadline_required:
-                        if deadline == "None":
-                            include = include and item.delivery_deadline is None
-                        elif deadline == "not None":
-                            include = include and item.delivery_deadline is not None
-                        else:
-                            include = include and item.delivery_deadline == deadline
-                    
-
-                    #adding item to output list if it meets all criteria
-                    if include:
-                        items_to_return.append(item)
+                            include = include and item.id == int(word)
+                    else:
+                        pass
+                if address_required:
+                    include = include and item.address == address
+                if city_required:
+                    include = include and item.city == city
+                if state_required:
+                    include = include and item.state == state
+                if zip_required:
+                    include = include and item.zip == zip_
+                if mass_required:
+                    include = include and item.mass == mass
+                if node_required:
+                    include = include and item.delivery_node \
+                        is delivery_node
+                if status_required:
+                    include = include and item.status in statuses
+                
+                if deadline_required:
+                    if deadline == "None":
+                        include = include and item.delivery_deadline is None
+                    elif deadline == "not None":
+                        include = include and item.delivery_deadline is not None
+                    else:
+                        include = include and item.delivery_deadline == deadline
+                
+
+                #adding item to output list if it meets all criteria
+                if include:
+                    items_to_return.append(item)
             
             return items_to_return
 
+    def status_groups(self, statuses):
+        # This method returns the groups of the status index for each of 
+        # the given status codes, in O(S), where S is the number of codes
+        index = self.indexes['status']
+        return [index.get(status, {}) for status in statuses]
+
+    def deadline_groups(self, deadline):
+        # This method returns the groups of the deadline index that match 
+        # the deadline query, in O(D), where D is the number of distinct 
+        # deadlines.
+        index = self.indexes['delivery_deadline']
+        if deadline == "None":
+            return [index.get(None, {})]
+        elif deadline == "not None":
+            return [group for value, group in index.items() \
+                if value is not None]
+        else:
+            return [index.get(deadline, {})]
+
     def remove(self, key):
-        # This method loops through each item in the table to find a 
-        # match for the specified key. If a match is found, it removes 
+        # This method hashes the key and looks through its bucket to find 
+        # a match for the specified key. If a match is found, it removes 
         # that item from the table. This method has a runtime complexity
-        # of O(N).
-        key_exists = False
+        # of O(1) on average, as the table keeps its buckets small.
         bucket_index = hash(key) % len(self.table)
         bucket = self.table[bucket_index]
-        for i, kv in enumerate(bucket):
-            k, v = kv
-            if key == k:
-                key_exists = True
-                break
+        i = self.find(bucket, key)
 
-        if key_exists:
-            del bucket[i]
+        if i is not None:
+            self.remove_from_indexes(key, bucket[i + 1])
+            del bucket[i:i + 2]
+            self.size = self.size - 1
 
     def items(self):
         # This method loops through each item in the table and returns 
@@ -147,9 +326,8 @@ class Table:
         items = []
 
         for bucket in self.table:
-            for kv in bucket:
-                k, item = kv
-                items.append(item)
+            if bucket is not None:
+                items.extend(bucket[1::2])
 
         return items
 
@@ -2,10 +2,23 @@
 
 import math
 from priority_queue import PriorityQueue
+from parcel import Status
 #from parcel_group import ParcelGroup
 #from main import CapacityError
 
 class Truck:
+    # Each truck moves through the day as a small state machine:
+    #   AT HUB      -> DELIVERING  when it leaves the hub with a load
+    #   DELIVERING  -> RETURNING   once its last group is delivered
+    #   RETURNING   -> AT HUB      when it gets back to the hub
+    #   AT HUB      -> FINISHED    when there is nothing left to load
+    # A finished truck goes back to DELIVERING if it is given a new load
+    # later in the day, e.g. once delayed parcels reach the hub.
+    AT_HUB = 'AT HUB'
+    DELIVERING = 'DELIVERING'
+    RETURNING = 'RETURNING'
+    FINISHED = 'FINISHED'
+
     def __init__(self, id_=None, driver=None, capacity=16, hub_node=None):
         # The Truck object holds all of the necessary attributes of each
         # truck that is in service, as well as some methods related to 
@@ -27,7 +40,7 @@ class Truck:
         self.curr_node = None
         self.next_node = None
 
-        self.finished = False
+        self.state = Truck.AT_HUB
 
     def get_total_miles(self):
         return self.total_miles
@@ -40,7 +53,24 @@ class Truck:
         # parcels in parcel_group.
         self.cargo.push(parcel_group)
         for parcel in parcel_group.items():
-            parcel.set_status('EN ROUTE - TRUCK ' + str(self.id))
+            parcel.set_status(Status.EN_ROUTE, self.id)
+
+    def get_route(self):
+        # This method returns the groups on the truck in the order they 
+        # will be delivered, in O(K log K)
+        return self.cargo.items()
+
+    def set_route(self, route):
+        # This method makes the truck deliver its groups in the order 
+        # given by route. Groups that are already on the truck are moved 
+        # to their new place, and any new groups are loaded. It runs in 
+        # O(K log K + N), where N is the number of parcels in new groups.
+        for i, group in enumerate(route):
+            if group in self.cargo:
+                self.cargo.update_priority(group, len(route) - i)
+            else:
+                group.set_priority(len(route) - i)
+                self.add_parcel_group(group)
 
     def deliver_parcels(self):
         # This method grabs the next ParcelGroup from the PriorityQueue
@@ -50,13 +80,14 @@ class Truck:
         # of O(N), where N is the number of parcels in this group.
         parcel_group = self.cargo.pop()
         for parcel in parcel_group.items():
+            parcel.set_delivery_time(self.current_time)
             if parcel.delivery_deadline is not None:
                 if self.current_time <= parcel.delivery_deadline:
-                    parcel.set_status('DELIVERED')
+                    parcel.set_status(Status.DELIVERED)
                 else:
-                    parcel.set_status('DELIVERED LATE')
+                    parcel.set_status(Status.DELIVERED_LATE)
             else:
-                parcel.set_status('DELIVERED')
+                parcel.set_status(Status.DELIVERED)
 
     def get_next_node(self):
         # This method looks at the next group of parcels to be 
@@ -76,12 +107,8 @@ class Truck:
         if (self.curr_node is self.next_node):
             return self.current_time
         else:
-            the_time = (self.current_time + math.ceil( \
-                self.curr_node.get_distance(self.next_node) / self.speed))
-            
-            if int(str(the_time)[-2:]) >= 60:
-                the_time = the_time + 40
-            return the_time
+            return self.current_time + math.ceil( \
+                self.curr_node.get_distance(self.next_node) / self.speed)
 
     def load_count(self):
         # Getter function, runtime of O(1)
@@ -106,6 +133,8 @@ class Truck:
         self.curr_node = self.hub_node
         self.next_node = self.get_next_node()
         self.arrival_time = self.calc_arrival_time()
+        if self.cargo.count() > 0:
+            self.state = Truck.DELIVERING
 
     def update(self, timestamp):
         # This method updates the truck with the current_time.
@@ -116,7 +145,7 @@ class Truck:
         self.current_time = timestamp
 
         if self.current_time >= self.arrival_time:
-            if self.finished is not True:
+            if self.state != Truck.FINISHED:
                 self.total_miles += self.curr_node.get_distance(self.next_node)
             self.prev_node = self.curr_node
             self.curr_node = self.next_node
@@ -127,6 +156,7 @@ class Truck:
 
                 if self.cargo.count() == 0:
                     self.next_node = self.hub_node
+                    self.state = Truck.RETURNING
                 else:
                     self.next_node = self.get_next_node()
                 
@@ -138,6 +168,8 @@ class Truck:
                     # there are no more parcels to be delivered at the 
                     # hub, the truck will be retired for the day via 
                     # the finish_day() method
+                    if self.state != Truck.FINISHED:
+                        self.state = Truck.AT_HUB
                     return 1
                 else:
                     return 0
@@ -146,11 +178,32 @@ class Truck:
             # is still in transit to its next destination
             return 0
     
+    def is_leaving(self, timestamp):
+        # A truck that is setting off from the hub with a load at the 
+        # given time hasn't gone anywhere yet, so its first stop can 
+        # still be changed. This method runs in O(1).
+        return self.state == Truck.DELIVERING \
+            and self.curr_node is self.hub_node \
+            and self.current_time == timestamp
+
     def finish_day(self):
         # Setter function, runtime O(1)
-        self.finished = True
+        self.state = Truck.FINISHED
     
 
     def is_finished(self):
         # Getter function, runtime O(1)
-        return self.finished
+        return self.state == Truck.FINISHED
+
+    def get_state(self):
+        # Getter function, runtime O(1)
+        return self.state
+
+
+def build_fleet(size, hub_node, capacity=16):
+    # This function creates size trucks based at the hub, numbered from 1, 
+    # with one driver each. It raises a ValueError if there isn't at 
+    # least one truck, and runs in O(T), where T is the fleet size.
+    if size < 1:
+        raise ValueError('the fleet needs at least one truck')
+    return [Truck(i + 1, i + 1, capacity, hub_node) for i in range(size)]